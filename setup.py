@@ -34,6 +34,10 @@ setup(
     packages=find_packages(exclude=("tests",)),
     python_requires=">=3.10",
     install_requires=install_requires,
+    extras_require={
+        "async": ["aiohttp==3.8.5"],
+        "watch": ["inotify-simple==1.3.5"],
+    },
     entry_points={
         "console_scripts": [
             "shippy=shippy.__main__:main",
@@ -1,9 +1,13 @@
 import argparse
-import re
-import glob
 import os.path
+import re
 import signal
 import sys
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
 from json import JSONDecodeError
 from loguru import logger
 
@@ -13,16 +17,39 @@ import sentry_sdk
 
 from rich import print
 from rich.console import Console
-
-from .client import (
-    get_hash_from_checksum_file,
-    get_hash_of_file,
-    find_checksum_file,
-    Client,
+from rich.table import Table
+
+from .cache import get_cache_entry, get_cached_value, set_cached_value
+from .checksum import get_hash_from_checksum_file, get_hashes_of_file
+from .client import Client, progress_display
+from .config import (
+    get_config_sections,
+    get_config_value,
+    set_config_value,
+    get_optional_config_value,
+    get_optional_true_config_value,
+    get_optional_int_config_value,
 )
-from .config import get_config_value, set_config_value, get_optional_true_config_value
 from .constants import (
     SENTRY_SDK_URL,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_UPLOAD_WINDOW_SIZE,
+    CHUNK_SIZE,
+    DEFAULT_MAX_CHUNK_SIZE,
+    DEFAULT_CHUNK_RETRY_COUNT,
+    DEFAULT_UPLOAD_RETRY_COUNT,
+    DEFAULT_UPLOAD_CONCURRENCY,
+    UPLOAD_ORDERS,
+    DEFAULT_VALIDATION_WORKERS,
+    DEFAULT_WATCH_SETTLE_TIME,
+    DEFAULT_WATCH_POLL_INTERVAL,
+    MIRROR_SECTION_PREFIX,
+    DEFAULT_MIRROR_BUFFER_SIZE,
+    GITHUB_LATEST_RELEASE_URL,
+    DEFAULT_UPDATE_CHECK_TTL,
+    UPDATE_CHECK_TIMEOUT,
     SERVER_COMPAT_ERROR_MSG,
     SHIPPY_COMPAT_ERROR_MSG,
     SHIPPY_OUTDATED_MSG,
@@ -32,7 +59,16 @@ from .constants import (
     PRERELEASE_WARNING_MSG,
     NO_CONFIGURATION_WARNING_MSG,
 )
-from .exceptions import LoginException, UploadException
+from .discovery import discover_builds
+from .exceptions import (
+    DuplicateBuildException,
+    LoginException,
+    UploadException,
+    ValidationException,
+)
+from .fanout import upload_to_servers
+from .finalizer import BuildFinalizer
+from .watcher import BuildWatcher
 from .helper import input_yn, print_error, print_warning, print_success
 from .version import __version__, server_compat_version
 
@@ -54,6 +90,20 @@ def sigint_handler(*_):
 signal.signal(signal.SIGINT, sigint_handler)
 
 
+@contextmanager
+def interruptible_executor(max_workers, stop_event=None):
+    """A ThreadPoolExecutor that doesn't wait for its work when shippy is interrupted"""
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield executor
+    except BaseException:
+        if stop_event is not None:
+            stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+
 def lower_logger_level():
     logger.remove()
     logger.add(sys.stderr, level="INFO")
@@ -75,48 +125,73 @@ def main():
 
     print(f"Welcome to shippy (v.{__version__})!")
 
-    # Check for updates
-    check_shippy_update()
+    # Initialize clients. Builds are uploaded to every mirror as well.
+    clients = [build_client_from_config(args)] + build_mirror_clients(args)
+    try:
+        latest_version = fetch_precheck_data(clients)
+
+        # Check for updates
+        check_shippy_update(latest_version)
+        for client in clients:
+            server_prechecks(client)
+
+        # Start uploads
+        if args.watch:
+            watch_and_upload_builds(clients, args)
+        else:
+            search_and_upload_builds(clients, args)
+    finally:
+        for client in clients:
+            client.close()
 
-    # Initialize client
-    client = build_client_from_config()
-    server_prechecks(client)
 
-    # Start uploads
-    search_and_upload_builds(client, args)
+def fetch_precheck_data(clients):
+    """Prefetches what the startup checks need, returning the latest shippy version"""
+    with console.status("Please wait while shippy contacts the remote servers... "):
+        with ThreadPoolExecutor() as executor:
+            latest_version = executor.submit(get_latest_shippy_version)
+
+            # Failures are left for the checks to report when they retry these
+            for client in clients:
+                executor.submit(client.get_version)
+                executor.submit(client.is_token_valid)
+                executor.submit(client.get_regex_pattern)
+
+            return latest_version.result()
 
 
 def server_prechecks(client):
+    if client.name is not None:
+        print(f"Checking the mirror {client.name}...")
     check_server_compat(client)
     check_token_validity(client)
 
 
-def check_and_upload_build(client, args, build_path):
-    # Check build file validity
-    if not check_build(client, build_path):
-        print_warning("Invalid build. Skipping...")
-        return
-
+def prompt_and_upload_build(clients, args, build_path, hashes, finalizer):
     if is_upload_without_prompt_enabled(args) or input_yn(
         f"Uploading build {build_path}. Start?"
     ):
         try:
-            upload_id = client.upload(build_path=build_path)
-
-            if is_build_disabling_enabled():
-                client.disable_build(upload_id=upload_id)
+            upload_build(clients, build_path, hashes, finalizer)
         except UploadException as exception:
             print_error(exception, newline=True, exit_after=False)
 
 
-def search_and_upload_builds(client, args):
-    # Search current directory for files with regex pattern returned by server
-    build_paths = get_builds_in_current_dir(client.get_regex_pattern())
+def search_and_upload_builds(clients, args):
+    # Search for files with regex pattern returned by server
+    with console.status("Detecting builds..."):
+        checksum_files = discover_builds(
+            get_regex_pattern(clients),
+            roots=args.paths or ["."],
+            recursive=args.recursive,
+            exclude_patterns=args.exclude or [],
+        )
+    build_paths = list(checksum_files)
 
     if len(build_paths) == 0:
         print_error(
             msg="No files matching the submission criteria were detected in the "
-            "current directory.",
+            "searched directories.",
             newline=True,
             exit_after=False,
         )
@@ -130,8 +205,226 @@ def search_and_upload_builds(client, args):
             if not input_yn("Are you sure you want to continue?", default=False):
                 return
 
-        for build_path in build_paths:
-            check_and_upload_build(client, args, build_path)
+        build_paths = sort_builds(clients[0], build_paths, get_upload_order(args))
+        valid_builds = validate_builds(
+            clients, build_paths, checksum_files, is_zip_verification_enabled(args)
+        )
+        if not valid_builds:
+            return
+
+        concurrency = get_upload_concurrency(args)
+        finalizer = BuildFinalizer(
+            max_workers=concurrency * len(clients),
+            disable_builds=is_build_disabling_enabled(),
+        )
+        try:
+            if concurrency > 1 and len(valid_builds) > 1:
+                upload_builds_concurrently(valid_builds, concurrency, finalizer)
+            else:
+                for build_path, (hashes, targets) in valid_builds.items():
+                    prompt_and_upload_build(
+                        targets, args, build_path, hashes, finalizer
+                    )
+            finalizer.wait()
+        except BaseException:
+            finalizer.cancel()
+            raise
+
+
+def upload_builds_concurrently(valid_builds, concurrency, finalizer):
+    """Uploads several builds at the same time, without prompting for each"""
+    stop_event = threading.Event()
+    with progress_display(), interruptible_executor(concurrency, stop_event) as pool:
+        uploads = {
+            pool.submit(
+                upload_build, targets, build_path, hashes, finalizer, stop_event
+            ): build_path
+            for build_path, (hashes, targets) in valid_builds.items()
+        }
+
+        for upload in as_completed(uploads):
+            try:
+                upload.result()
+            except UploadException as exception:
+                print_error(
+                    f"{uploads[upload]}: {exception}", newline=True, exit_after=False
+                )
+
+
+def watch_and_upload_builds(clients, args):
+    """Uploads new builds as they appear in the watched directories"""
+    concurrency = get_upload_concurrency(args)
+    finalizer = BuildFinalizer(
+        max_workers=concurrency * len(clients),
+        disable_builds=is_build_disabling_enabled(),
+    )
+    watcher = BuildWatcher(
+        get_regex_pattern(clients),
+        roots=args.watch,
+        settle_time=get_optional_int_config_value(
+            "shippy", "WatchSettleTime", DEFAULT_WATCH_SETTLE_TIME
+        ),
+        poll_interval=get_optional_int_config_value(
+            "shippy", "WatchPollInterval", DEFAULT_WATCH_POLL_INTERVAL
+        ),
+        recursive=args.recursive,
+        exclude_patterns=args.exclude or [],
+    )
+
+    stop_event = threading.Event()
+    try:
+        with watcher, interruptible_executor(concurrency, stop_event) as pool:
+            print(
+                f"Watching {', '.join(args.watch)} for new builds. "
+                "Press Ctrl+C to stop."
+            )
+            for ready_builds in watcher.watch():
+                for build_path, checksum_file in ready_builds:
+                    print(f"Detected new build {build_path}")
+                    upload = pool.submit(
+                        validate_and_upload_build,
+                        get_build_targets(clients, build_path),
+                        build_path,
+                        checksum_file,
+                        finalizer,
+                        is_zip_verification_enabled(args),
+                        stop_event,
+                    )
+                    upload.add_done_callback(partial(report_upload_error, build_path))
+                finalizer.report_finished()
+    except BaseException:
+        finalizer.cancel()
+        raise
+
+
+def validate_and_upload_build(
+    clients, build_path, checksum_file, finalizer, verify_zip=False, stop_event=None
+):
+    try:
+        hashes, targets = validate_build(clients, build_path, checksum_file, verify_zip)
+        upload_build(targets, build_path, hashes, finalizer, stop_event)
+    except DuplicateBuildException as exception:
+        print_warning(f"{build_path}: {exception} Skipping...")
+    except (ValidationException, UploadException) as exception:
+        print_error(f"{build_path}: {exception}", newline=True, exit_after=False)
+
+
+def report_upload_error(build_path, upload):
+    """Reports errors validate_and_upload_build doesn't handle, so they aren't lost"""
+    if upload.cancelled() or upload.exception() is None:
+        return
+
+    exception = upload.exception()
+    logger.opt(exception=exception).debug(f"Uploading {build_path} failed")
+    print_error(f"{build_path}: {exception}", newline=True, exit_after=False)
+
+
+def upload_build(clients, build_path, hashes, finalizer, stop_event=None):
+    if len(clients) == 1:
+        client = clients[0]
+        upload_id, checksum = client.upload_chunks(
+            build_path=build_path,
+            checksum=hashes.get(client.get_checksum_type().lower()),
+            stop_event=stop_event,
+        )
+
+        # The server processes the build in the background while the next one uploads
+        finalizer.submit(client, build_path, upload_id, checksum)
+        return
+
+    # Mirrors share a single read of the build, and one failing doesn't stop the others
+    upload_to_servers(
+        clients,
+        build_path,
+        hashes,
+        buffer_size=get_optional_int_config_value(
+            "shippy", "MirrorBufferSize", DEFAULT_MIRROR_BUFFER_SIZE
+        ),
+        stop_event=stop_event,
+        on_uploaded=partial(finalize_mirrored_build, build_path, finalizer),
+    )
+
+
+def finalize_mirrored_build(build_path, finalizer, client, result):
+    if isinstance(result, UploadException):
+        print_error(
+            f"{client.get_build_label(build_path)}: {result}",
+            newline=True,
+            exit_after=False,
+        )
+    else:
+        upload_id, checksum = result
+        finalizer.submit(client, build_path, upload_id, checksum)
+
+
+def get_regex_pattern(clients):
+    """Returns a pattern matching the builds any of the servers accepts"""
+    patterns = list(dict.fromkeys(client.get_regex_pattern() for client in clients))
+    if len(patterns) == 1:
+        return patterns[0]
+    return "|".join(f"(?:{pattern})" for pattern in patterns)
+
+
+def get_build_targets(clients, build_path):
+    """Returns the clients of the servers whose filename pattern the build matches"""
+    filename = os.path.basename(build_path)
+    return [
+        client for client in clients if re.search(client.get_regex_pattern(), filename)
+    ]
+
+
+def get_server_name(client):
+    return client.name or urllib.parse.urlparse(client.server_url).netloc
+
+
+def sort_builds(client, build_paths, order):
+    match order:
+        case "smallest":
+            return sorted(build_paths, key=os.path.getsize)
+        case "variant":
+            variants = client.get_shippy_upload_variants()
+
+            def variant_priority(build_path):
+                variant = get_build_variant(build_path)
+                if variant in variants:
+                    return variants.index(variant)
+                return len(variants)
+
+            return sorted(build_paths, key=variant_priority)
+        case _:
+            return build_paths
+
+
+def get_build_variant(build_path):
+    try:
+        _, _, _, _, build_variant, _ = split_build_filename(build_path)
+    except ValidationException:
+        return None
+    return build_variant
+
+
+def split_build_filename(build_path):
+    """Returns the parts of the build's filename between dashes, without extension"""
+    build_slug, _ = os.path.splitext(os.path.basename(build_path))
+    parts = build_slug.split("-")
+    if len(parts) != 6:
+        raise ValidationException("This build's filename has an unexpected format.")
+    return parts
+
+
+def get_upload_concurrency(args):
+    concurrency = args.jobs or get_optional_int_config_value(
+        "shippy", "UploadConcurrency", DEFAULT_UPLOAD_CONCURRENCY
+    )
+    return max(1, concurrency)
+
+
+def get_upload_order(args):
+    return args.order or get_optional_config_value("shippy", "UploadOrder", "detected")
+
+
+def is_zip_verification_enabled(args):
+    return args.verify_zip or get_optional_true_config_value("shippy", "VerifyZip")
 
 
 def is_upload_without_prompt_enabled(args):
@@ -140,7 +433,7 @@ def is_upload_without_prompt_enabled(args):
     return config_value or args.yes
 
 
-def build_client_from_config():
+def build_client_from_config(args):
     try:
         url = get_config_value("shippy", "server")
         if not check_server_url_schema(url):
@@ -152,14 +445,82 @@ def build_client_from_config():
             )
 
         token = get_config_value("shippy", "token")
-        server = Client(server_url=url, token=token)
+        server = Client(server_url=url, token=token, **get_connection_config(args))
     except KeyError:
         print_warning(NO_CONFIGURATION_WARNING_MSG)
-        server = Client(server_url=get_server_url())
+        server = Client(server_url=get_server_url(), **get_connection_config(args))
         prompt_login(server)
     return server
 
 
+def build_mirror_clients(args):
+    """Returns a client for every mirror in the configuration file"""
+    mirrors = []
+    for section in get_config_sections(MIRROR_SECTION_PREFIX):
+        name = section[len(MIRROR_SECTION_PREFIX) :]
+        try:
+            url = get_config_value(section, "server")
+            token = get_config_value(section, "token")
+        except KeyError:
+            print_error(
+                msg=f"The mirror {name} needs both a server and a token in the "
+                "configuration file.",
+                newline=True,
+                exit_after=True,
+            )
+        if not check_server_url_schema(url):
+            print_error(
+                msg=f"The server URL of the mirror {name} is missing either http:// "
+                "or https://.",
+                newline=True,
+                exit_after=True,
+            )
+        mirrors.append(
+            Client(
+                server_url=url, token=token, name=name, **get_connection_config(args)
+            )
+        )
+    return mirrors
+
+
+def get_connection_config(args):
+    upload_window_size = args.window or get_optional_int_config_value(
+        "shippy", "UploadWindowSize", DEFAULT_UPLOAD_WINDOW_SIZE
+    )
+
+    return {
+        # Every build uploaded at the same time needs its own connections
+        "pool_size": max(
+            get_optional_int_config_value("shippy", "PoolSize", DEFAULT_POOL_SIZE),
+            get_upload_concurrency(args) * upload_window_size,
+        ),
+        "connect_timeout": get_optional_int_config_value(
+            "shippy", "ConnectTimeout", DEFAULT_CONNECT_TIMEOUT
+        ),
+        "read_timeout": get_optional_int_config_value(
+            "shippy", "ReadTimeout", DEFAULT_READ_TIMEOUT
+        ),
+        "info_cache_ttl": get_optional_int_config_value(
+            "shippy", "ServerInfoCacheTTL", 0
+        ),
+        "upload_window_size": upload_window_size,
+        "min_chunk_size": get_optional_int_config_value(
+            "shippy", "MinChunkSize", CHUNK_SIZE
+        ),
+        "max_chunk_size": get_optional_int_config_value(
+            "shippy", "MaxChunkSize", DEFAULT_MAX_CHUNK_SIZE
+        ),
+        "chunk_retry_count": get_optional_int_config_value(
+            "shippy", "ChunkRetryCount", DEFAULT_CHUNK_RETRY_COUNT
+        ),
+        "upload_retry_count": get_optional_int_config_value(
+            "shippy", "UploadRetryCount", DEFAULT_UPLOAD_RETRY_COUNT
+        ),
+        "delta_upload": args.delta
+        or get_optional_true_config_value("shippy", "DeltaUpload"),
+    }
+
+
 def init_argparse():
     parser = argparse.ArgumentParser(
         description="Client-side tool for interfacing with shipper"
@@ -176,6 +537,62 @@ def init_argparse():
         action="store_true",
         help="Enable debug mode",
     )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=int,
+        metavar="N",
+        help="Number of chunks to keep in flight at once while uploading",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="Number of builds to upload at the same time",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only send the parts of builds the server doesn't have from earlier "
+        "uploads, if the server supports it",
+    )
+    parser.add_argument(
+        "--verify-zip",
+        action="store_true",
+        help="Check that builds are intact zip files before uploading them",
+    )
+    parser.add_argument(
+        "--order",
+        choices=UPLOAD_ORDERS,
+        help="Order in which to upload builds",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="PATH",
+        help="Directories to search for builds (default: the current directory)",
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Search the given directories recursively",
+    )
+    parser.add_argument(
+        "-e",
+        "--exclude",
+        action="append",
+        metavar="PATTERN",
+        help="Skip files and directories matching this glob pattern (repeatable)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="append",
+        metavar="DIR",
+        help="Keep running and upload new builds as they appear in this directory "
+        "(repeatable)",
+    )
     parser.add_argument(
         "-v",
         "--version",
@@ -227,30 +644,66 @@ def check_token_validity(client):
             print_success(
                 f"Successfully validated token! Hello, {client.get_username()}!"
             )
+        elif client.name is not None:
+            # Mirror tokens aren't saved by signing in, so they have to be fixed by hand
+            print_error(
+                msg=f"The token of the mirror {client.name} is invalid. Please update "
+                "it in the configuration file.",
+                newline=True,
+                exit_after=True,
+            )
         else:
             # Token check failed, prompt for login again
             print_warning("The saved token is invalid. Please sign-in again.")
             prompt_login(client)
 
 
-def check_shippy_update():
-    with console.status("Please wait while shippy checks for updates... "):
-        try:
-            r = requests.get(
-                "https://api.github.com/repos/shipperstack/shippy/releases/latest"
-            )
-            latest_version = r.json()["name"]
-        except KeyError:
-            print_error(
-                "Failed to contact the GitHub API to check the latest version.",
-                newline=True,
-                exit_after=False,
-            )
+def get_latest_shippy_version():
+    """Returns the latest version of shippy, cached for UpdateCheckTTL"""
+    ttl = get_optional_int_config_value(
+        "shippy", "UpdateCheckTTL", DEFAULT_UPDATE_CHECK_TTL
+    )
+    if (cached := get_cached_value("update_check", "latest_release", ttl)) is not None:
+        return cached["version"]
+
+    entry = get_cache_entry("update_check", "latest_release")
+    cached = entry["value"] if entry is not None else None
+
+    # Conditional requests for an unchanged release don't count against the rate limit
+    headers = {}
+    if cached is not None and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+
+    try:
+        r = requests.get(
+            GITHUB_LATEST_RELEASE_URL, headers=headers, timeout=UPDATE_CHECK_TIMEOUT
+        )
+        if r.status_code == 304 and cached is not None:
+            latest_release = cached
+        else:
+            latest_release = {
+                "version": r.json()["name"],
+                "etag": r.headers.get("ETag"),
+            }
+    except (KeyError, ValueError, requests.exceptions.RequestException):
+        return cached["version"] if cached is not None else None
+
+    set_cached_value("update_check", "latest_release", latest_release)
+    return latest_release["version"]
+
+
+def check_shippy_update(latest_version):
+    if latest_version is None:
+        print_error(
+            "Failed to contact the GitHub API to check the latest version.",
+            newline=True,
+            exit_after=False,
+        )
 
     # Check if user is running an alpha/beta build
     if is_prerelease():
         print_warning(PRERELEASE_WARNING_MSG)
-    else:
+    elif latest_version is not None:
         # User is running a stable build, proceed with update check
         if semver.compare(__version__, latest_version) == -1:
             print(SHIPPY_OUTDATED_MSG.format(__version__, latest_version))
@@ -262,70 +715,106 @@ def is_prerelease():
     return "a" in __version__ or "b" in __version__
 
 
-def get_builds_in_current_dir(regex_pattern):
-    with console.status("Detecting builds in current directory..."):
-        builds = []
-        files = [f for f in glob.glob("*.zip")]
-        for file in files:
-            if re.search(regex_pattern, file):
-                builds.append(file)
+def validate_builds(clients, build_paths, checksum_files, verify_zip=False):
+    """Validates every build at the same time before any is uploaded"""
+    workers = get_optional_int_config_value(
+        "shippy", "ValidationWorkers", DEFAULT_VALIDATION_WORKERS
+    )
+    with console.status(f"Validating {len(build_paths)} build(s)..."):
+        with interruptible_executor(max(1, workers)) as executor:
+            validations = {
+                build_path: executor.submit(
+                    validate_build,
+                    get_build_targets(clients, build_path),
+                    build_path,
+                    checksum_files[build_path],
+                    verify_zip,
+                )
+                for build_path in build_paths
+            }
+
+            table = Table()
+            table.add_column("Build", overflow="fold")
+            table.add_column("Result")
+            if len(clients) > 1:
+                table.add_column("Servers")
+            valid_builds = {}
+            duplicate_count = 0
+            for build_path, validation in validations.items():
+                try:
+                    valid_builds[build_path] = validation.result()
+                    row = [build_path, "[green]\u2713 Passed"]
+                    if len(clients) > 1:
+                        _, targets = valid_builds[build_path]
+                        row.append(", ".join(map(get_server_name, targets)))
+                    table.add_row(*row)
+                except DuplicateBuildException as exception:
+                    duplicate_count += 1
+                    table.add_row(build_path, f"[yellow]\u26a0 {exception}")
+                except ValidationException as exception:
+                    table.add_row(build_path, f"[red]\u274c {exception}")
+
+    console.print(table)
+    if len(valid_builds) + duplicate_count < len(build_paths):
+        print_warning("Invalid builds will be skipped.")
+    if duplicate_count:
+        print_warning("Builds the server already has will be skipped.")
+    return valid_builds
+
+
+def validate_build(clients, filename, checksum_file, verify_zip=False):
+    """Makes sure the build is valid, returning its checksums and where to upload it"""
+    _, _, _, build_type, build_variant, _ = split_build_filename(filename)
 
-        return builds
+    # Check build type
+    if build_type != "OFFICIAL":
+        raise ValidationException("This build is not official.")
 
+    # Check build variant
+    clients = [
+        client
+        for client in clients
+        if build_variant in client.get_shippy_upload_variants()
+    ]
+    if not clients:
+        raise ValidationException("This build has an unknown variant.")
 
-def check_build(client, filename):
-    """Makes sure the build is valid"""
-    print(f"Validating build {filename}...")
     # Validate that there is a matching checksum file
-    has_checksum_file_type, has_sum_postfix = find_checksum_file(filename=filename)
+    checksum_file_type, checksum_file_path = checksum_file
 
-    if has_checksum_file_type is None:
-        print_warning(
-            "This build does not have a matching checksum file. ", newline=False
-        )
-        return False
+    if checksum_file_type is None:
+        raise ValidationException("This build does not have a matching checksum file.")
 
-    # Validate checksum
-    with console.status(f"Checking {has_checksum_file_type.upper()} hash..."):
-        hash_val = get_hash_of_file(
-            filename=filename, checksum_type=has_checksum_file_type
+    # Validate checksum. The checksums the servers want are calculated in the same
+    # pass, so the build doesn't have to be hashed again when finalizing the upload.
+    try:
+        hashes = get_hashes_of_file(
+            filename=filename,
+            checksum_types=[checksum_file_type]
+            + [client.get_checksum_type() for client in clients],
+            verify_zip=verify_zip,
         )
-        if not has_sum_postfix:
-            actual_hash_val = get_hash_from_checksum_file(
-                f"{filename}.{has_checksum_file_type}"
-            )
-        else:
-            actual_hash_val = get_hash_from_checksum_file(
-                f"{filename}.{has_checksum_file_type}sum"
-            )
-        if hash_val != actual_hash_val:
-            print_error(
-                msg="This build's checksum is invalid. ",
-                newline=False,
-                exit_after=False,
-            )
-            return False
-        print_success("Success!")
+    except OSError as exception:
+        raise ValidationException(f"This build could not be read: {exception}")
 
-    build_slug, _ = os.path.splitext(filename)
-    _, _, _, build_type, build_variant, _ = build_slug.split("-")
+    hash_val = hashes[checksum_file_type]
+    actual_hash_val = get_hash_from_checksum_file(checksum_file_path)
+    if hash_val != actual_hash_val:
+        raise ValidationException("This build's checksum is invalid.")
 
-    # Check build type
-    if build_type != "OFFICIAL":
-        print_error(msg="This build is not official. ", newline=False, exit_after=False)
-        return False
+    # Uploading a build the server already has would only be rejected at the end
+    clients = [
+        client for client in clients if not is_duplicate_build(client, filename, hashes)
+    ]
+    if not clients:
+        raise DuplicateBuildException("The server already has this build.")
+
+    return hashes, clients
 
-    # Check build variant
-    if build_variant not in client.get_shippy_upload_variants():
-        print_error(
-            msg="This build has an unknown variant. ",
-            newline=False,
-            exit_after=False,
-        )
-        return False
 
-    print_success(f"Validation of build {filename} complete. No problems found.")
-    return True
+def is_duplicate_build(client, filename, hashes):
+    checksum = hashes.get(client.get_checksum_type().lower())
+    return checksum is not None and client.build_exists(filename, checksum)
 
 
 def get_server_url():
@@ -0,0 +1,468 @@
+import asyncio
+import json
+import urllib.parse
+
+import semver
+
+from .cache import (
+    get_cached_checksum,
+    get_cached_value,
+    get_file_identity,
+    set_cached_checksums,
+    set_cached_value,
+)
+from .checksum import get_hash_object
+from .client import (
+    ResumableUpload,
+    build_exists_check,
+    chunk_retry_check,
+    create_chunk_sizer,
+    disable_build_check,
+    finalize_exception_check,
+    find_upload_attempt,
+    find_upload_offset,
+    get_build_exists_url,
+    get_chunk_request,
+    get_request_header,
+    get_token_from_login_response,
+    log_debug_request_response,
+    log_debug_request_send,
+    print_upload_success,
+    supports_build_lookup,
+)
+from .constants import (
+    CHUNK_SIZE,
+    DEFAULT_CHUNK_RETRY_COUNT,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_CHUNK_SIZE,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_UPLOAD_RETRY_COUNT,
+    FAILED_TO_RETRIEVE_SERVER_VERSION_ERROR_MSG,
+    RATE_LIMIT_MSG,
+    RATE_LIMIT_RETRY_COUNT,
+    UNKNOWN_UPLOAD_ERROR_MSG,
+)
+from .exceptions import RetryableUploadException, UploadException
+from .journal import remove_journal_entry
+from .multipart import MultipartBody
+from .ratelimit import get_rate_limiter, get_retry_after
+from .version import server_compat_version, __version__
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse:
+    """A fully read aiohttp response, shaped like a requests response"""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+async def stream_multipart_body(body):
+    for part in body:
+        yield part
+
+
+class AsyncClient:
+    """asyncio counterpart of Client, built on aiohttp"""
+
+    def __init__(
+        self,
+        server_url,
+        token=None,
+        pool_size=DEFAULT_POOL_SIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        info_cache_ttl=0,
+        min_chunk_size=CHUNK_SIZE,
+        max_chunk_size=DEFAULT_MAX_CHUNK_SIZE,
+        chunk_retry_count=DEFAULT_CHUNK_RETRY_COUNT,
+        upload_retry_count=DEFAULT_UPLOAD_RETRY_COUNT,
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncClient requires aiohttp. Install it with "
+                "`pip3 install shipper-shippy[async]`."
+            )
+
+        self.server_url = server_url
+        self.token = token
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self.info_cache_ttl = info_cache_ttl
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.chunk_retry_count = chunk_retry_count
+        self.upload_retry_count = upload_retry_count
+        self.rate_limiter = get_rate_limiter(server_url)
+
+        self._session = None
+        self._info = None
+        self._info_lock = asyncio.Lock()
+        self._regex_pattern = None
+        self._token_check_response = None
+        self._chunk_sizer = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def is_url_secure(self):
+        return self.server_url[0:5] == "https"
+
+    async def is_server_compatible(self):
+        server_compat = semver.VersionInfo.parse(server_compat_version)
+        return await self.get_version() >= server_compat
+
+    async def is_shippy_compatible(self):
+        shippy_version = semver.VersionInfo.parse(__version__)
+        return shippy_version >= await self.get_shippy_compat_version()
+
+    async def login(self, username, password):
+        r = await self._post(
+            url="/api/v1/maintainers/login/",
+            data={"username": username, "password": password},
+        )
+
+        token = get_token_from_login_response(r, self.is_url_secure())
+        if token is not None:
+            self.token = token
+            self._regex_pattern = None
+            self._token_check_response = None
+
+    async def get_version(self):
+        return semver.VersionInfo.parse((await self._get_info())["version"])
+
+    async def get_shippy_compat_version(self):
+        info = await self._get_info()
+        return semver.VersionInfo.parse(info["shippy_compat_version"])
+
+    async def get_shippy_upload_variants(self):
+        return json.loads((await self._get_info())["shippy_upload_variants"])
+
+    async def get_checksum_type(self):
+        return (await self._get_info())["shippy_upload_checksum_type"]
+
+    async def get_chunk_sizer(self):
+        # Shared between builds, so what was learned about the link carries over
+        info = await self._get_info()
+        if self._chunk_sizer is None:
+            self._chunk_sizer = create_chunk_sizer(
+                info, self.min_chunk_size, self.max_chunk_size
+            )
+        return self._chunk_sizer
+
+    async def _get_info(self):
+        # Uploads running at the same time wait for the first one to fetch the info
+        async with self._info_lock:
+            if self._info is None:
+                info = get_cached_value(
+                    "server_info", self.server_url, self.info_cache_ttl
+                )
+                if info is None:
+                    r = await self._get(url="/api/v1/system/info")
+                    if r.status_code != 200:
+                        raise Exception(FAILED_TO_RETRIEVE_SERVER_VERSION_ERROR_MSG)
+                    info = r.json()
+                    if self.info_cache_ttl > 0:
+                        set_cached_value("server_info", self.server_url, info)
+                self._info = info
+            return self._info
+
+    async def get_regex_pattern(self):
+        if self._regex_pattern is not None:
+            return self._regex_pattern
+
+        r = await self._get(
+            url="/api/v1/maintainers/upload_filename_regex_pattern",
+            headers=self._get_header(),
+        )
+
+        if r.status_code == 200:
+            self._regex_pattern = r.json()["pattern"]
+            return self._regex_pattern
+
+    async def get_username(self):
+        return (await self._check_token()).json()["username"]
+
+    async def is_token_valid(self):
+        return (await self._check_token()).status_code == 200
+
+    async def _check_token(self):
+        # One response answers both whether the token is valid and who it belongs to
+        if self._token_check_response is None:
+            self._token_check_response = await self._get(
+                url="/api/v1/maintainers/token_check/",
+                headers=self._get_header(),
+            )
+        return self._token_check_response
+
+    async def _get_upload_info(self, build_path):
+        return find_upload_attempt(await self._get_upload_attempts(), build_path)
+
+    async def _get_upload_offset(self, upload_id):
+        return find_upload_offset(await self._get_upload_attempts(), upload_id)
+
+    async def _get_upload_attempts(self):
+        try:
+            r = await self._get(
+                url="/api/v1/maintainers/chunked_upload/", headers=self._get_header()
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            raise RetryableUploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+        return r.json()
+
+    async def upload(self, build_path, checksum=None):
+        upload_id, checksum = await self.upload_chunks(build_path, checksum)
+        await self.finalize_upload(build_path, upload_id, checksum)
+        print_upload_success(build_path)
+        return upload_id
+
+    async def upload_chunks(self, build_path, checksum=None):
+        """Sends the build to the server, returning the upload ID and checksum"""
+        identity = get_file_identity(build_path)
+        checksum_type = await self.get_checksum_type()
+        hash_obj = None
+        if checksum is None:
+            checksum = get_cached_checksum(identity, checksum_type)
+        if checksum is None:
+            hash_obj = get_hash_object(checksum_type)
+
+        upload = AsyncChunkedUpload(
+            self,
+            build_path,
+            checksum_type,
+            await self.get_chunk_sizer(),
+            hash_obj,
+            checksum,
+        )
+        upload_id = await upload.run()
+
+        if upload.hash_obj is not None:
+            checksum = upload.hash_obj.hexdigest()
+            set_cached_checksums(identity, {checksum_type: checksum})
+        return upload_id, checksum
+
+    async def finalize_upload(self, build_path, upload_id, checksum):
+        try:
+            r = await self._post(
+                url=f"/api/v1/maintainers/chunked_upload/{upload_id}/",
+                headers=self._get_header(),
+                data={await self.get_checksum_type(): checksum},
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+        finalize_exception_check(r)
+        remove_journal_entry(self.server_url, build_path)
+
+    async def build_exists(self, build_path, checksum):
+        if not await self.is_build_lookup_supported():
+            return False
+
+        url = get_build_exists_url(build_path, await self.get_checksum_type(), checksum)
+        try:
+            r = await self._get(url=url, headers=self._get_header())
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+        return build_exists_check(r)
+
+    async def is_build_lookup_supported(self):
+        return supports_build_lookup(await self.get_version())
+
+    async def disable_build(self, upload_id):
+        r = await self._post(
+            "/api/v1/maintainers/build/enabled_status_modify/",
+            headers=self._get_header(),
+            data={"build_id": upload_id, "enable": False},
+        )
+        disable_build_check(r, upload_id)
+
+    async def _upload_chunk(self, build_path, chunk, current, total, upload_id):
+        url, headers, body = get_chunk_request(
+            self.token, build_path, chunk, current, total, upload_id
+        )
+        return await self._request("PUT", url, headers=headers, data=body)
+
+    def _get_header(self, chunk=None, current=None, total=None):
+        return get_request_header(self.token, chunk, current, total)
+
+    def _get_session(self):
+        # aiohttp sessions have to be created inside the running event loop
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.timeout,
+            )
+        return self._session
+
+    async def _request(self, type, url, headers=None, data=None):
+        request_url = urllib.parse.urljoin(self.server_url, url)
+        log_debug_request_send(
+            request_type=type,
+            url=request_url,
+            headers=headers,
+            data=data,
+        )
+
+        for _ in range(RATE_LIMIT_RETRY_COUNT + 1):
+            await asyncio.sleep(self.rate_limiter.reserve())
+
+            # Streamed bodies can only be read once, so each attempt gets a new stream
+            request_data = data
+            if isinstance(data, MultipartBody):
+                request_data = stream_multipart_body(data)
+
+            async with self._get_session().request(
+                type,
+                request_url,
+                headers=headers,
+                data=request_data,
+                allow_redirects=type != "POST",
+            ) as response:
+                r = AsyncResponse(
+                    url=str(response.url),
+                    status_code=response.status,
+                    headers=response.headers,
+                    content=await response.read(),
+                )
+            log_debug_request_response(r)
+
+            if r.status_code != 429:
+                break
+
+            # The rate limiter holds back every request until the server allows more
+            if self.rate_limiter.limited(get_retry_after(r)):
+                print(RATE_LIMIT_MSG)
+
+        return r
+
+    async def _post(self, url, headers=None, data=None):
+        return await self._request("POST", url, headers, data)
+
+    async def _get(self, url, headers=None, data=None):
+        return await self._request("GET", url, headers, data)
+
+
+class AsyncChunkedUpload(ResumableUpload):
+    """Sends a single build to the server in chunks, one at a time"""
+
+    def __init__(
+        self,
+        client,
+        build_path,
+        checksum_type,
+        chunk_sizer,
+        hash_obj=None,
+        checksum=None,
+    ):
+        super().__init__(client, build_path, checksum_type, hash_obj, checksum)
+        self.chunk_sizer = chunk_sizer
+
+    async def run(self):
+        await self._resume()
+        try:
+            with open(self.build_path, "rb", buffering=0) as build_file:
+                await self._send_chunks(build_file)
+        except asyncio.CancelledError:
+            # What the server has so far is kept, so the next run can resume from it
+            self._save_journal(force=True)
+            raise
+
+        self._save_journal(force=True)
+        return self.upload_id
+
+    async def _send_chunks(self, build_file):
+        buffer = bytearray()
+        while True:
+            chunk_size = self.chunk_sizer.get_size()
+            if len(buffer) < chunk_size:
+                buffer = bytearray(chunk_size)
+            view = memoryview(buffer)[:chunk_size]
+
+            # Disk reads happen on the default executor to keep the loop responsive
+            build_file.seek(self.offset)
+            size = await asyncio.to_thread(build_file.readinto, view)
+            if not size:
+                return
+            chunk = view[:size]
+
+            try:
+                r = await self._send_chunk(chunk)
+                if r.status_code == 413 and self.chunk_sizer.shrink(size):
+                    # Read the same part again in smaller chunks
+                    continue
+                self._handle_chunk_response(r, chunk)
+            except RetryableUploadException as exception:
+                await self._recover(exception)
+
+    async def _resume(self):
+        # Checking the journal may hash the uploaded part, so it runs off the loop
+        if not await asyncio.to_thread(self._load_journal):
+            # Uploads started elsewhere can still be found by their filename
+            self.offset, self.upload_id = await self.client._get_upload_info(
+                self.build_path
+            )
+            await asyncio.to_thread(self._hash_range, 0, self.offset)
+
+    async def _recover(self, exception):
+        """Waits before retrying, then continues from the offset the server confirmed"""
+        while True:
+            await asyncio.sleep(self._count_retry(exception))
+
+            try:
+                await self._resync()
+                return
+            except RetryableUploadException as resync_exception:
+                exception = resync_exception
+
+    async def _resync(self):
+        if self.upload_id:
+            server_offset = await self.client._get_upload_offset(self.upload_id)
+            if server_offset is None and not self.offset_confirmed:
+                # The upload recorded in the journal is gone from the server
+                self._restart()
+                return
+        else:
+            # The first chunk may have created the upload before failing
+            server_offset, self.upload_id = await self.client._get_upload_info(
+                self.build_path
+            )
+        await asyncio.to_thread(self._confirm_offset, server_offset)
+
+    async def _send_chunk(self, chunk):
+        loop = asyncio.get_running_loop()
+        try:
+            start_time = loop.time()
+            r = await self.client._upload_chunk(
+                build_path=self.build_path,
+                chunk=chunk,
+                current=self.offset,
+                total=self.total_size,
+                upload_id=self.upload_id,
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+            raise RetryableUploadException(exception)
+
+        if r.status_code == 200:
+            self.chunk_sizer.record(len(chunk), loop.time() - start_time)
+        chunk_retry_check(r)
+        return r
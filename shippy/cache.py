@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+
+from loguru import logger
+
+from .config import home_dir, get_optional_int_config_value
+from .constants import DEFAULT_CHECKSUM_CACHE_SIZE
+
+# Constants
+CACHE_FILE = f"{home_dir}/.shippy_cache.json"
+CHECKSUM_CACHE_FILE = f"{home_dir}/.shippy_checksums.json"
+
+cache_lock = threading.Lock()
+
+
+def read_cache_file(path):
+    try:
+        with open(path, "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache_file(path, data):
+    # Write to a temporary file first so a crash never leaves a half-written cache
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as cache_file:
+            json.dump(data, cache_file, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except OSError as exception:
+        logger.debug(f"Failed to write cache file {path}: {exception}")
+
+
+def get_cache_entry(section, key):
+    """Returns the cached entry regardless of its age, or None if it is missing"""
+    with cache_lock:
+        return read_cache_file(CACHE_FILE).get(section, {}).get(key)
+
+
+def get_cached_value(section, key, ttl):
+    """Returns the cached value, or None if it is missing or older than ttl seconds"""
+    if ttl <= 0:
+        return None
+
+    entry = get_cache_entry(section, key)
+    if entry is None or time.time() - entry["timestamp"] > ttl:
+        return None
+    return entry["value"]
+
+
+def set_cached_value(section, key, value):
+    with cache_lock:
+        data = read_cache_file(CACHE_FILE)
+        data.setdefault(section, {})[key] = {"value": value, "timestamp": time.time()}
+        write_cache_file(CACHE_FILE, data)
+
+
+def get_file_identity(path):
+    """Returns a key that changes whenever the file is replaced or modified"""
+    stat = os.stat(path)
+    return (
+        f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}"
+    )
+
+
+def get_checksum_cache_size():
+    return get_optional_int_config_value(
+        "shippy", "ChecksumCacheSize", DEFAULT_CHECKSUM_CACHE_SIZE
+    )
+
+
+def get_cached_checksum(identity, checksum_type):
+    if get_checksum_cache_size() <= 0:
+        return None
+
+    with cache_lock:
+        entry = read_cache_file(CHECKSUM_CACHE_FILE).get(
+            f"{identity}:{checksum_type.lower()}"
+        )
+    return entry[0] if entry is not None else None
+
+
+def set_cached_checksums(identity, checksums):
+    """Stores the hashes of the file with the given identity, evicting the oldest"""
+    max_size = get_checksum_cache_size()
+    if max_size <= 0 or not checksums:
+        return
+
+    with cache_lock:
+        data = read_cache_file(CHECKSUM_CACHE_FILE)
+        for checksum_type, checksum in checksums.items():
+            data[f"{identity}:{checksum_type.lower()}"] = [checksum, int(time.time())]
+
+        if len(data) > max_size:
+            oldest_keys = sorted(data, key=lambda key: data[key][1])
+            for key in oldest_keys[: len(data) - max_size]:
+                del data[key]
+
+        write_cache_file(CHECKSUM_CACHE_FILE, data)
@@ -0,0 +1,145 @@
+import hashlib
+import os.path
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import get_cached_checksum, get_file_identity, set_cached_checksums
+from .constants import CHECKSUM_FILE_TYPES, HASH_BUFFER_SIZE, ZIP_CHECK_CACHE_TYPE
+from .zipcheck import ZipVerifier
+
+
+def get_hash_object(checksum_type):
+    checksum_type = checksum_type.lower()
+
+    # SHAKE digests need an explicit length, so they can't be used as checksums here
+    if (
+        checksum_type not in hashlib.algorithms_guaranteed
+        or checksum_type.startswith("shake_")
+    ):
+        # Unsupported checksum type
+        return None
+
+    return hashlib.new(checksum_type)
+
+
+def read_blocks(file, length=None, buffer_count=1):
+    """Yields memoryviews of the file, stopping after length bytes if given"""
+    # Reuse the same buffers for every block so memory usage stays flat no matter how
+    # large the build is. A block is only valid until buffer_count more are read.
+    buffers = [memoryview(bytearray(HASH_BUFFER_SIZE)) for _ in range(buffer_count)]
+    index = 0
+    remaining = length
+    while remaining is None or remaining > 0:
+        view = buffers[index]
+        if remaining is not None:
+            view = view[: min(remaining, len(view))]
+        size = file.readinto(view)
+        if not size:
+            return
+        yield view[:size]
+
+        index = (index + 1) % buffer_count
+        if remaining is not None:
+            remaining -= size
+
+
+def update_hash_from_file(hash_obj, file, length=None):
+    for block in read_blocks(file, length=length):
+        hash_obj.update(block)
+
+
+def update_hashes_from_file(hash_objs, file):
+    """Feeds the file into every hash object in a single read"""
+    if len(hash_objs) == 1:
+        update_hash_from_file(hash_objs[0], file)
+        return
+
+    # hashlib releases the GIL while hashing, so each hash object gets its own thread.
+    # Two buffers are used so the next block is read while the last one is hashed.
+    with ThreadPoolExecutor(max_workers=len(hash_objs)) as executor:
+        pending = []
+        for block in read_blocks(file, buffer_count=2):
+            for future in pending:
+                future.result()
+            pending = [executor.submit(obj.update, block) for obj in hash_objs]
+        for future in pending:
+            future.result()
+
+
+def get_hashes_of_file(filename, checksum_types, verify_zip=False):
+    """Returns a dict of checksum type to hash, skipping unsupported types"""
+    identity = get_file_identity(filename)
+
+    hashes = {}
+    hash_objs = {}
+    for checksum_type in checksum_types:
+        checksum_type = checksum_type.lower()
+        if checksum_type in hashes or checksum_type in hash_objs:
+            continue
+
+        if (cached := get_cached_checksum(identity, checksum_type)) is not None:
+            hashes[checksum_type] = cached
+        elif (hash_obj := get_hash_object(checksum_type)) is not None:
+            hash_objs[checksum_type] = hash_obj
+
+    # The zip check shares the read, and builds that passed are cached like hashes
+    verifier = None
+    if verify_zip and get_cached_checksum(identity, ZIP_CHECK_CACHE_TYPE) is None:
+        verifier = ZipVerifier(filename)
+
+    if hash_objs or verifier is not None:
+        consumers = list(hash_objs.values())
+        if verifier is not None:
+            consumers.append(verifier)
+        with open(filename, "rb", buffering=0) as file:
+            update_hashes_from_file(consumers, file)
+
+        new_hashes = {
+            checksum_type: hash_obj.hexdigest()
+            for checksum_type, hash_obj in hash_objs.items()
+        }
+        hashes.update(new_hashes)
+        if verifier is not None:
+            verifier.finish()
+            new_hashes[ZIP_CHECK_CACHE_TYPE] = "passed"
+        set_cached_checksums(identity, new_hashes)
+
+    return hashes
+
+
+def get_hash_of_file(filename, checksum_type):
+    return get_hashes_of_file(filename, [checksum_type]).get(checksum_type.lower())
+
+
+def get_hash_from_checksum_file(checksum_file):
+    with open(checksum_file, "r") as checksum_file_raw:
+        line = checksum_file_raw.readline()
+        values = line.split(" ")
+        return values[0]
+
+
+def get_checksum_file_names(basename, checksum_type):
+    # Checksum files without the "sum" postfix take precedence
+    return f"{basename}.{checksum_type}", f"{basename}.{checksum_type}sum"
+
+
+def find_checksum_file(filename, sibling_names=None):
+    """Returns the type and path of the build's checksum file, or (None, None)"""
+    directory, basename = os.path.split(filename)
+    # Without a listing of the directory, each possible checksum file is looked up
+    if sibling_names is None:
+        sibling_names = {
+            name
+            for checksum_type in CHECKSUM_FILE_TYPES
+            for name in get_checksum_file_names(basename, checksum_type)
+            if os.path.isfile(os.path.join(directory, name))
+        }
+
+    # Later checksum types take precedence
+    checksum_file_type, checksum_file = None, None
+    for checksum_type in CHECKSUM_FILE_TYPES:
+        for name in get_checksum_file_names(basename, checksum_type):
+            if name in sibling_names:
+                checksum_file_type = checksum_type
+                checksum_file = os.path.join(directory, name)
+                break
+    return checksum_file_type, checksum_file
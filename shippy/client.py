@@ -1,14 +1,19 @@
-import hashlib
 import json
+import math
 import os.path
+import random
 import requests
-import re
+import threading
 import time
 import urllib.parse
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from json.decoder import JSONDecodeError
 
 import semver
+from requests.adapters import HTTPAdapter
 from rich.console import Console
 from rich.progress import (
     BarColumn,
@@ -27,14 +32,50 @@ from .constants import (
     RATE_LIMIT_MSG,
     UNKNOWN_UPLOAD_ERROR_MSG,
     UNKNOWN_UPLOAD_START_ERROR_MSG,
+    UPLOAD_INTERRUPTED_MSG,
+    CHUNK_TOO_LARGE_ERROR_MSG,
     WAITING_FINALIZATION_MSG,
     CHUNK_SIZE,
+    DEFAULT_MAX_CHUNK_SIZE,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_UPLOAD_WINDOW_SIZE,
+    DEFAULT_CHUNK_RETRY_COUNT,
+    DEFAULT_UPLOAD_RETRY_COUNT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    CHUNK_PREFETCH_COUNT,
+    RATE_LIMIT_RETRY_COUNT,
+    JOURNAL_SAVE_INTERVAL,
+    JOURNAL_CHECKPOINT_INTERVAL,
 )
-from .exceptions import LoginException, UploadException
-from .version import server_compat_version, __version__
+from .cache import (
+    get_cached_checksum,
+    get_cached_value,
+    get_file_identity,
+    set_cached_checksums,
+    set_cached_value,
+)
+from .checksum import get_hash_object, update_hash_from_file
+from .delta import find_blocks
+from .exceptions import LoginException, RetryableUploadException, UploadException
+from .journal import get_journal_entry, remove_journal_entry, set_journal_entry
+from .multipart import MultipartBody
+from .ratelimit import get_rate_limiter, get_retry_after
+from .reader import ChunkReader
+from .sizing import ChunkSizer
+from .version import build_lookup_server_version, server_compat_version, __version__
 
 console = Console()
 
+# Responses to chunks that are worth retrying, as the server or a proxy in front of it
+# may recover
+RETRYABLE_STATUS_CODES = [500, 502, 503, 504]
+
+# Responses to chunks that arrived at an offset the server didn't expect
+OFFSET_MISMATCH_STATUS_CODES = [400, 409, 416]
+
 # Set up progress bar
 progress = Progress(
     TextColumn("[progress.description]{task.description}"),
@@ -48,6 +89,26 @@ progress = Progress(
     TimeRemainingColumn(),
     transient=True,
 )
+progress_lock = threading.Lock()
+progress_users = 0
+
+
+@contextmanager
+def progress_display():
+    """Shows the progress bar for as long as any upload is using it"""
+    global progress_users
+
+    with progress_lock:
+        if progress_users == 0:
+            progress.start()
+        progress_users += 1
+    try:
+        yield progress
+    finally:
+        with progress_lock:
+            progress_users -= 1
+            if progress_users == 0:
+                progress.stop()
 
 
 def log_debug_request_send(request_type, url, headers=None, data=None):
@@ -67,9 +128,59 @@ def log_debug_request_response(r):
 
 
 class Client:
-    def __init__(self, server_url, token=None):
+    def __init__(
+        self,
+        server_url,
+        token=None,
+        pool_size=DEFAULT_POOL_SIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        info_cache_ttl=0,
+        upload_window_size=DEFAULT_UPLOAD_WINDOW_SIZE,
+        min_chunk_size=CHUNK_SIZE,
+        max_chunk_size=DEFAULT_MAX_CHUNK_SIZE,
+        chunk_retry_count=DEFAULT_CHUNK_RETRY_COUNT,
+        upload_retry_count=DEFAULT_UPLOAD_RETRY_COUNT,
+        delta_upload=False,
+        name=None,
+    ):
         self.server_url = server_url
+        # Only set for mirrors, to tell them apart in the output
+        self.name = name
         self.token = token
+        self.timeout = (connect_timeout, read_timeout)
+        self.info_cache_ttl = info_cache_ttl
+        self.upload_window_size = upload_window_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.chunk_retry_count = chunk_retry_count
+        self.upload_retry_count = upload_retry_count
+        self.delta_upload = delta_upload
+        self.rate_limiter = get_rate_limiter(server_url)
+        self._chunk_sizer = None
+        self._chunk_sizer_lock = threading.Lock()
+
+        # Set once the server rejects chunks that arrive out of order
+        self.ordered_uploads_only = False
+
+        # Server metadata is memoized for the lifetime of the client. Concurrent
+        # uploads share the client, so the info is only fetched once.
+        self._info = None
+        self._info_lock = threading.Lock()
+        self._regex_pattern = None
+        self._token_check_response = None
+        self._delta_upload_supported = None
+
+        # Keep connections alive between requests so chunk uploads don't pay for a
+        # new TCP/TLS handshake every time
+        self.session = requests.Session()
+        pool_size = max(pool_size, upload_window_size)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
 
     def is_url_secure(self):
         return self.server_url[0:5] == "https"
@@ -88,31 +199,11 @@ class Client:
             data={"username": username, "password": password},
         )
 
-        match r.status_code:
-            case 200:
-                token = r.json()["token"]
-
-                if token == b"":
-                    raise LoginException("Server returned an empty token.")
-                else:
-                    self.token = token
-            case 301:
-                if not self.is_url_secure():
-                    raise LoginException(
-                        "Server uses HTTPS, but was supplied HTTP URL."
-                    )
-            case 400:
-                if r.json()["error"] == "blank_username_or_password":
-                    raise LoginException("Username or password must not be blank.")
-            case 404:
-                if r.json()["error"] == "invalid_credential":
-                    raise LoginException("Invalid credentials!")
-            case 502:
-                raise LoginException("The gateway server is currently unavailable.")
-            case 503:
-                raise LoginException("The server is temporarily unavailable.")
-            case _:
-                handle_undefined_response(r)
+        token = get_token_from_login_response(r, self.is_url_secure())
+        if token is not None:
+            self.token = token
+            self._regex_pattern = None
+            self._token_check_response = None
 
     def get_version(self):
         return semver.VersionInfo.parse(self._get_info()["version"])
@@ -124,6 +215,19 @@ class Client:
         return json.loads(self._get_info()["shippy_upload_variants"])
 
     def _get_info(self):
+        with self._info_lock:
+            if self._info is None:
+                info = get_cached_value(
+                    "server_info", self.server_url, self.info_cache_ttl
+                )
+                if info is None:
+                    info = self._fetch_info()
+                    if self.info_cache_ttl > 0:
+                        set_cached_value("server_info", self.server_url, info)
+                self._info = info
+            return self._info
+
+    def _fetch_info(self):
         r = self._get(url="/api/v1/system/info")
         if r.status_code == 200:
             return r.json()
@@ -131,106 +235,208 @@ class Client:
             raise Exception(FAILED_TO_RETRIEVE_SERVER_VERSION_ERROR_MSG)
 
     def get_regex_pattern(self):
+        if self._regex_pattern is not None:
+            return self._regex_pattern
+
         r = self._get(
             url="/api/v1/maintainers/upload_filename_regex_pattern",
             headers=self._get_header(),
         )
 
         if r.status_code == 200:
-            return r.json()["pattern"]
+            self._regex_pattern = r.json()["pattern"]
+            return self._regex_pattern
 
-    def _get_checksum_type(self):
+    def get_checksum_type(self):
         return self._get_info()["shippy_upload_checksum_type"]
 
-    def get_username(self):
-        r = self._get(
-            url="/api/v1/maintainers/token_check/",
-            headers=self._get_header(),
-        )
+    def get_chunk_sizer(self):
+        # Shared between builds, so what was learned about the link carries over
+        with self._chunk_sizer_lock:
+            if self._chunk_sizer is None:
+                self._chunk_sizer = create_chunk_sizer(
+                    self._get_info(), self.min_chunk_size, self.max_chunk_size
+                )
+            return self._chunk_sizer
 
-        return r.json()["username"]
+    def get_username(self):
+        return self._check_token().json()["username"]
 
     def is_token_valid(self):
-        r = self._get(
-            url="/api/v1/maintainers/token_check/",
-            headers=self._get_header(),
-        )
-
-        return r.status_code == 200
+        return self._check_token().status_code == 200
+
+    def _check_token(self):
+        # One response answers both whether the token is valid and who it belongs to
+        if self._token_check_response is None:
+            self._token_check_response = self._get(
+                url="/api/v1/maintainers/token_check/",
+                headers=self._get_header(),
+            )
+        return self._token_check_response
 
     def _get_upload_info(self, build_path):
-        current_byte = 0
-        upload_id = ""
+        return find_upload_attempt(self._get_upload_attempts(), build_path)
 
-        # Check for previous attempts
+    def _get_upload_offset(self, upload_id):
+        return find_upload_offset(self._get_upload_attempts(), upload_id)
+
+    def _get_upload_attempts(self):
         try:
-            previous_attempts = self._get(
+            return self._get(
                 url="/api/v1/maintainers/chunked_upload/", headers=self._get_header()
             ).json()
         except requests.exceptions.RequestException:
-            raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
-        for attempt in previous_attempts:
-            if build_path == attempt["filename"]:
-                logger.debug(
-                    f"Found a previous upload attempt for the build {build_path}, "
-                    f"created on {attempt['created_at']}",
-                )
-                current_byte = attempt["offset"]
-                upload_id = attempt["id"]
-        return current_byte, upload_id
+            raise RetryableUploadException(UNKNOWN_UPLOAD_ERROR_MSG)
 
-    def upload(self, build_path):
-        total_file_size = os.path.getsize(build_path)
+    def upload(self, build_path, checksum=None):
+        upload_id, checksum = self.upload_chunks(build_path, checksum)
 
-        with progress:
-            upload_progress = progress.add_task(
-                "[green]Uploading...", total=total_file_size
+        # Finalize upload to begin processing
+        with console.status(WAITING_FINALIZATION_MSG):
+            self.finalize_upload(build_path, upload_id, checksum)
+        print_upload_success(self.get_build_label(build_path))
+
+        return upload_id
+
+    def get_build_label(self, build_path):
+        if self.name is None:
+            return build_path
+        return f"{build_path} ({self.name})"
+
+    def upload_chunks(self, build_path, checksum=None, source=None, stop_event=None):
+        """Sends the build to the server, returning the upload ID and checksum"""
+        # Unless the caller or the checksum cache already knows it, the checksum is
+        # calculated as the chunks are read, so the build doesn't have to be read again
+        # just to finalize it
+        identity = get_file_identity(build_path)
+        checksum_type = self.get_checksum_type()
+        hash_obj = None
+        if checksum is None:
+            checksum = get_cached_checksum(identity, checksum_type)
+        if checksum is None:
+            hash_obj = get_hash_object(checksum_type)
+
+        with progress_display():
+            label = self.get_build_label(os.path.basename(build_path))
+            progress_task = progress.add_task(
+                f"[green]Uploading {label}...",
+                total=os.path.getsize(build_path),
             )
+            try:
+                if self.delta_upload and self.is_delta_upload_supported():
+                    upload = DeltaUpload(
+                        self, build_path, progress_task, hash_obj, stop_event
+                    )
+                else:
+                    upload = ChunkedUpload(
+                        self,
+                        build_path,
+                        progress_task,
+                        hash_obj,
+                        checksum,
+                        source,
+                        stop_event,
+                    )
+                upload_id = upload.run()
+            finally:
+                progress.remove_task(progress_task)
 
-            current_byte, upload_id = self._get_upload_info(build_path)
-
-            with open(build_path, "rb") as build_file:
-                build_file.seek(current_byte)
-                chunk = build_file.read(CHUNK_SIZE)
-                while chunk:
-                    try:
-                        r = self._upload_chunk(
-                            build_path=build_path,
-                            chunk=chunk,
-                            current=current_byte,
-                            total=total_file_size,
-                            upload_id=upload_id,
-                        )
-
-                        if r.status_code == 200:
-                            upload_id = r.json()["id"]
-                            current_byte += len(chunk)
-                            progress.update(upload_progress, completed=current_byte)
-
-                            # Read next chunk and continue
-                            chunk = build_file.read(CHUNK_SIZE)
-                        elif int(r.status_code / 100) == 4:
-                            upload_handle_4xx_response(r)
-                        else:
-                            raise UploadException(UNKNOWN_UPLOAD_START_ERROR_MSG)
-                    except requests.exceptions.RequestException:
-                        raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+        if upload.hash_obj is not None:
+            checksum = upload.hash_obj.hexdigest()
+            set_cached_checksums(identity, {checksum_type: checksum})
+        return upload_id, checksum
 
-        # Finalize upload to begin processing
+    def finalize_upload(self, build_path, upload_id, checksum):
         try:
-            with console.status(WAITING_FINALIZATION_MSG):
-                checksum = get_hash_of_file(
-                    build_path, checksum_type=self._get_checksum_type()
-                )
-                r = self._upload_finalize(upload_id=upload_id, checksum=checksum)
+            r = self._upload_finalize(upload_id=upload_id, checksum=checksum)
+            finalize_exception_check(r)
+        except requests.exceptions.RequestException:
+            raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+        remove_journal_entry(self.server_url, build_path)
+
+    def build_exists(self, build_path, checksum):
+        """Asks the server whether it already has the build"""
+        if not self.is_build_lookup_supported():
+            return False
 
-                upload_exception_check(r, build_path)
-        except UploadException as e:
-            raise e
+        url = get_build_exists_url(build_path, self.get_checksum_type(), checksum)
+        try:
+            r = self._get(url=url, headers=self._get_header())
         except requests.exceptions.RequestException:
+            return False
+        return build_exists_check(r)
+
+    def is_build_lookup_supported(self):
+        return supports_build_lookup(self.get_version())
+
+    def is_delta_upload_supported(self):
+        """Checks whether the server accepts delta uploads"""
+        if self._delta_upload_supported is None:
+            try:
+                self._delta_upload_supported = self._get_missing_blocks([]) is not None
+            except UploadException:
+                return False
+        return self._delta_upload_supported
+
+    def _get_missing_blocks(self, digests):
+        """Returns the blocks the server doesn't have, or None if unsupported"""
+        r = self._send_delta_request(
+            "POST",
+            url="/api/v1/maintainers/delta_upload/blocks/",
+            headers=self._get_json_header(),
+            data=json.dumps({"blocks": digests}),
+        )
+        if r.status_code == 404:
+            return None
+        elif r.status_code != 200:
+            upload_handle_4xx_response(r)
+
+        try:
+            return set(r.json()["missing"])
+        except (KeyError, ValueError):
             raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
 
-        return upload_id
+    def _upload_block(self, digest, data):
+        body = MultipartBody(fields={}, file_field="file", data=data)
+        headers = self._get_header()
+        headers["Content-Type"] = body.content_type
+
+        r = self._send_delta_request(
+            "PUT",
+            url=f"/api/v1/maintainers/delta_upload/blocks/{digest}/",
+            headers=headers,
+            data=body,
+        )
+        if r.status_code != 200:
+            upload_handle_4xx_response(r)
+
+    def _create_delta_upload(self, build_path, blocks):
+        """Creates the upload from its blocks, returning the upload ID"""
+        r = self._send_delta_request(
+            "POST",
+            url="/api/v1/maintainers/delta_upload/",
+            headers=self._get_json_header(),
+            data=json.dumps(
+                {
+                    "filename": os.path.basename(build_path),
+                    "blocks": [[block.digest, block.size] for block in blocks],
+                }
+            ),
+        )
+        if r.status_code == 200:
+            return r.json()["id"]
+        elif int(r.status_code / 100) == 4:
+            upload_handle_4xx_response(r)
+        raise UploadException(UNKNOWN_UPLOAD_START_ERROR_MSG)
+
+    def _send_delta_request(self, type, url, headers, data):
+        try:
+            r = self._request(type, url, headers, data)
+        except requests.exceptions.RequestException:
+            raise RetryableUploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+
+        chunk_retry_check(r)
+        return r
 
     def disable_build(self, upload_id):
         r = self._post(
@@ -238,23 +444,13 @@ class Client:
             headers=self._get_header(),
             data={"build_id": upload_id, "enable": False},
         )
-
-        if r.status_code == 200:
-            print(f"Build {upload_id} has been disabled.")
-        else:
-            raise Exception("There was a problem disabling the build.")
+        disable_build_check(r, upload_id)
 
     def _upload_chunk(self, build_path, chunk, current, total, upload_id):
-        if upload_id:
-            url = f"/api/v1/maintainers/chunked_upload/{upload_id}/"
-        else:
-            url = "/api/v1/maintainers/chunked_upload/"
-        result = self._put(
-            url=url,
-            headers=self._get_header(chunk=chunk, current=current, total=total),
-            data={"filename": build_path},
-            files={"file": chunk},
+        url, headers, body = get_chunk_request(
+            self.token, build_path, chunk, current, total, upload_id
         )
+        result = self._put(url=url, headers=headers, data=body)
         logger.debug(f"Got back: {result}")
         return result
 
@@ -262,21 +458,16 @@ class Client:
         return self._post(
             url=f"/api/v1/maintainers/chunked_upload/{upload_id}/",
             headers=self._get_header(),
-            data={self._get_checksum_type(): checksum},
+            data={self.get_checksum_type(): checksum},
         )
 
     def _get_header(self, chunk=None, current=None, total=None):
-        header = {
-            "User-Agent": f"shippy {__version__}",
-            "Authorization": f"Token {self.token}",
-        }
-
-        if chunk is not None and current is not None and total is not None:
-            header[
-                "Content-Range"
-            ] = f"bytes {current}-{current + len(chunk) - 1}/{total}"
+        return get_request_header(self.token, chunk, current, total)
 
-        return header
+    def _get_json_header(self):
+        headers = self._get_header()
+        headers["Content-Type"] = "application/json"
+        return headers
 
     def _request(self, type, url, headers=None, data=None, files=None):
         request_url = urllib.parse.urljoin(self.server_url, url)
@@ -286,41 +477,57 @@ class Client:
             headers=headers,
             data=data,
         )
+        for _ in range(RATE_LIMIT_RETRY_COUNT + 1):
+            self.rate_limiter.acquire()
+            r = self._send_request(type, request_url, headers, data, files)
+            log_debug_request_response(r)
+
+            if r.status_code != 429:
+                break
+
+            retry_after = get_retry_after(r)
+            if self.rate_limiter.limited(retry_after):
+                print(RATE_LIMIT_MSG)
+                self._wait_rate_limit(retry_after)
+
+        return r
+
+    def _send_request(self, type, request_url, headers, data, files):
         match type:
             case "GET":
-                r = requests.get(url=request_url, headers=headers, data=data)
+                return self.session.get(
+                    url=request_url,
+                    headers=headers,
+                    data=data,
+                    timeout=self.timeout,
+                )
             case "POST":
-                r = requests.post(
+                return self.session.post(
                     url=request_url,
                     headers=headers,
                     data=data,
                     allow_redirects=False,
+                    timeout=self.timeout,
                 )
             case "PUT":
-                r = requests.put(
+                return self.session.put(
                     url=request_url,
                     headers=headers,
                     data=data,
                     files=files,
+                    timeout=self.timeout,
                 )
-            case _:
-                return
-        log_debug_request_response(r)
 
-        # Check for rate limit
-        if r.status_code == 429:
-            print(RATE_LIMIT_MSG)
-            self._wait_rate_limit(int(re.findall(r"\d+", r.json()["detail"])[0]))
+    def _wait_rate_limit(self, seconds):
+        # Other threads wait in the rate limiter on their own. The countdown can't be
+        # shown while the upload progress bars are, as only one can be displayed.
+        seconds = math.ceil(seconds)
+        if progress_users:
+            progress.console.print(RATE_LIMIT_WAIT_STATUS_MSG.format(seconds))
+            return
 
-            return self._request(
-                type=type, url=url, headers=headers, data=data, files=files
-            )
-
-        return r
-
-    def _wait_rate_limit(seconds):
         with console.status(RATE_LIMIT_WAIT_STATUS_MSG.format(seconds)) as status:
-            while seconds:
+            while seconds > 0:
                 time.sleep(1)
                 seconds -= 1
                 status.update(status=RATE_LIMIT_WAIT_STATUS_MSG.format(seconds))
@@ -331,10 +538,575 @@ class Client:
     def _get(self, url, headers=None, data=None):
         return self._request("GET", url, headers, data)
 
-    def _put(self, url, headers, data, files):
+    def _put(self, url, headers, data, files=None):
         return self._request("PUT", url, headers, data, files)
 
 
+class ResumableUpload:
+    """Where a chunked upload stands, kept in the resume journal between runs"""
+
+    def __init__(self, client, build_path, checksum_type, hash_obj=None, checksum=None):
+        self.client = client
+        self.build_path = build_path
+        self.checksum_type = checksum_type
+        self.hash_obj = hash_obj
+        self.checksum = checksum
+        self.total_size = os.path.getsize(build_path)
+        self.identity = get_file_identity(build_path)
+        self.offset = 0
+        self.upload_id = ""
+        self.retry_count = 0
+        self.retries_without_progress = 0
+
+        # Offsets from the journal are unconfirmed until the server accepts a chunk
+        self.offset_confirmed = True
+        self.checkpoints = []
+        self.journal_saved_at = 0
+
+    def _load_journal(self):
+        """Continues from the journal, returning False if the build isn't in it"""
+        entry = get_journal_entry(self.client.server_url, self.build_path)
+        if entry is None:
+            return False
+
+        if self._is_journal_entry_valid(entry):
+            logger.debug(f"Resuming {self.build_path} from offset {entry['offset']}")
+            self.offset = entry["offset"]
+            self.upload_id = entry["upload_id"]
+            self.checkpoints = entry["checkpoints"]
+            self.offset_confirmed = False
+        else:
+            logger.debug(f"{self.build_path} changed since it was last uploaded")
+            self._restart()
+        return True
+
+    def _is_journal_entry_valid(self, entry):
+        """Checks that the uploaded part hasn't changed, hashing it if needed"""
+        if (
+            entry["offset"] > self.total_size
+            or entry["checksum_type"] != self.checksum_type
+        ):
+            return False
+
+        if entry["identity"] == self.identity:
+            self._hash_range(0, entry["offset"])
+            return True
+        if self.checksum is not None:
+            return self.checksum == entry["checksum"]
+        if self.hash_obj is None or entry["digest"] is None:
+            return False
+
+        # The uploaded part is hashed anyway, so the digests are checked along the way
+        checkpoints = entry["checkpoints"] + [[entry["offset"], entry["digest"]]]
+        position = 0
+        for checkpoint_offset, digest in checkpoints:
+            self._hash_range(position, checkpoint_offset)
+            position = checkpoint_offset
+            if self.hash_obj.copy().hexdigest() != digest:
+                return False
+        return True
+
+    def _restart(self):
+        """Starts over with a new upload"""
+        remove_journal_entry(self.client.server_url, self.build_path)
+        self.offset = 0
+        self.upload_id = ""
+        self.offset_confirmed = True
+        self.checkpoints = []
+        if self.hash_obj is not None:
+            self.hash_obj = get_hash_object(self.hash_obj.name)
+
+    def _save_journal(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.journal_saved_at < JOURNAL_SAVE_INTERVAL:
+            return
+        self.journal_saved_at = now
+
+        digest = None
+        if self.hash_obj is not None:
+            digest = self.hash_obj.copy().hexdigest()
+            last_checkpoint = self.checkpoints[-1][0] if self.checkpoints else 0
+            if self.offset - last_checkpoint >= JOURNAL_CHECKPOINT_INTERVAL:
+                self.checkpoints.append([self.offset, digest])
+
+        set_journal_entry(
+            self.client.server_url,
+            self.build_path,
+            {
+                "upload_id": self.upload_id,
+                "offset": self.offset,
+                "identity": self.identity,
+                "checksum_type": self.checksum_type,
+                "checksum": self.checksum,
+                "digest": digest,
+                "checkpoints": self.checkpoints,
+            },
+        )
+
+    def _count_retry(self, exception):
+        """Returns how long to wait before retrying, raising once out of retries"""
+        self.retry_count += 1
+        self.retries_without_progress += 1
+        if (
+            self.retries_without_progress > self.client.chunk_retry_count
+            or self.retry_count > self.client.upload_retry_count
+        ):
+            raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+
+        delay = get_retry_delay(self.retries_without_progress)
+        logger.debug(
+            f"Upload of {self.build_path} failed at offset {self.offset}: "
+            f"{exception}. Retrying in {delay:.1f} seconds"
+        )
+        return delay
+
+    def _confirm_offset(self, server_offset):
+        """Continues from the offset the server reported after a failure"""
+        if server_offset is None or server_offset < self.offset:
+            raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+        self.offset_confirmed = True
+        if server_offset > self.offset:
+            self.retries_without_progress = 0
+
+        self._hash_range(self.offset, server_offset)
+        self.offset = server_offset
+
+    def _hash_range(self, start, end):
+        if self.hash_obj is None or start == end:
+            return
+
+        with open(self.build_path, "rb", buffering=0) as build_file:
+            build_file.seek(start)
+            update_hash_from_file(self.hash_obj, build_file, length=end - start)
+
+    def _handle_chunk_response(self, r, data):
+        if r.status_code == 200:
+            self.upload_id = r.json()["id"]
+            self.offset += len(data)
+            self.offset_confirmed = True
+            self.retries_without_progress = 0
+            if self.hash_obj is not None:
+                self.hash_obj.update(data)
+            self._save_journal()
+        elif r.status_code == 413:
+            raise UploadException(CHUNK_TOO_LARGE_ERROR_MSG)
+        elif int(r.status_code / 100) == 4 and not self.offset_confirmed:
+            # The server got further than the journal recorded, or lost the upload
+            raise RetryableUploadException(f"Server returned {r.status_code}")
+        elif int(r.status_code / 100) == 4:
+            upload_handle_4xx_response(r)
+        else:
+            raise UploadException(UNKNOWN_UPLOAD_START_ERROR_MSG)
+
+
+class ChunkedUpload(ResumableUpload):
+    """Sends a single build to the server in chunks"""
+
+    def __init__(
+        self,
+        client,
+        build_path,
+        progress_task,
+        hash_obj=None,
+        checksum=None,
+        source=None,
+        stop_event=None,
+    ):
+        super().__init__(
+            client, build_path, client.get_checksum_type(), hash_obj, checksum
+        )
+        self.progress_task = progress_task
+        self.source = source
+        self.stop_event = stop_event
+        self.chunk_sizer = client.get_chunk_sizer()
+
+    def run(self):
+        self._resume()
+
+        while True:
+            try:
+                if (
+                    self.client.upload_window_size > 1
+                    and not self.client.ordered_uploads_only
+                ):
+                    self._send_windowed()
+                else:
+                    self._send_sequential()
+                self._save_journal(force=True)
+                return self.upload_id
+            except RetryableUploadException as exception:
+                self._recover(exception)
+
+    def _resume(self):
+        if not self._load_journal():
+            # Uploads started elsewhere can still be found by their filename
+            self.offset, self.upload_id = self.client._get_upload_info(self.build_path)
+            # Only the part uploaded in a previous attempt needs to be hashed here
+            self._hash_range(0, self.offset)
+        progress.update(self.progress_task, completed=self.offset)
+
+    def _recover(self, exception):
+        """Waits before retrying, then continues from the offset the server confirmed"""
+        while True:
+            sleep_unless_stopped(self._count_retry(exception), self.stop_event)
+            self._check_stopped()
+
+            try:
+                self._resync()
+                return
+            except RetryableUploadException as resync_exception:
+                exception = resync_exception
+
+    def _open_reader(self, window_size):
+        # Uploads of the same build to several servers share a SharedChunkReader
+        if self.source is not None:
+            return self.source.open(self.offset, self.chunk_sizer)
+
+        # Enough buffers for every chunk in flight, plus the ones being read ahead
+        return ChunkReader(
+            self.build_path,
+            offset=self.offset,
+            get_chunk_size=self.chunk_sizer.get_size,
+            buffer_count=window_size + CHUNK_PREFETCH_COUNT,
+        )
+
+    def _send_sequential(self):
+        while True:
+            with self._open_reader(window_size=1) as reader:
+                while chunk := reader.read():
+                    self._check_stopped()
+                    r = self._send_chunk(chunk)
+                    if self._should_shrink(r, chunk):
+                        break
+                    self._handle_response(r, chunk)
+                    reader.release(chunk)
+                else:
+                    return
+            # The chunk was too large, so the rest is read again in smaller chunks
+
+    def _send_windowed(self):
+        window_size = self.client.upload_window_size
+        while True:
+            with self._open_reader(window_size) as reader:
+                rejected = self._send_window(reader, window_size)
+
+            if rejected is None:
+                return
+
+            if self.upload_id:
+                self._resync()
+            r, chunk = rejected
+            if r.status_code in OFFSET_MISMATCH_STATUS_CODES:
+                break
+            if not self._should_shrink(r, chunk):
+                # The chunk wasn't rejected for its offset, so it's an error
+                self._handle_response(r, chunk)
+
+        # Chunks sent ahead were rejected, so the server wants them in order. Any
+        # other errors will come up again when resending.
+        logger.debug("Server rejected out-of-order chunks, uploading sequentially")
+        self.client.ordered_uploads_only = True
+        self._send_sequential()
+
+    def _send_window(self, reader, window_size):
+        """Returns the response and chunk of the first rejected chunk, if any"""
+        # The server assigns the upload ID on the first chunk, so it goes alone. The
+        # same goes for the first chunk after an offset recorded in the journal.
+        if not self.upload_id or not self.offset_confirmed:
+            chunk = reader.read()
+            if chunk is None:
+                return None
+            self._check_stopped()
+            r = self._send_chunk(chunk)
+            if r.status_code == 413:
+                return r, chunk
+            self._handle_response(r, chunk)
+            reader.release(chunk)
+
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=window_size) as executor:
+            while True:
+                self._check_stopped()
+                while len(in_flight) < window_size and (chunk := reader.read()):
+                    in_flight.append((chunk, executor.submit(self._send_chunk, chunk)))
+
+                if not in_flight:
+                    return None
+
+                chunk, future = in_flight.popleft()
+                r = future.result()
+                if int(r.status_code / 100) == 4:
+                    return r, chunk
+                self._handle_response(r, chunk)
+                reader.release(chunk)
+
+    def _check_stopped(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            # What the server has so far is kept, so the next run can resume from it
+            self._save_journal(force=True)
+            raise UploadException(UPLOAD_INTERRUPTED_MSG)
+
+    def _should_shrink(self, r, chunk):
+        return r.status_code == 413 and self.chunk_sizer.shrink(len(chunk.data))
+
+    def _resync(self):
+        """Continues from the offset the server has confirmed"""
+        if self.upload_id:
+            server_offset = self.client._get_upload_offset(self.upload_id)
+            if server_offset is None and not self.offset_confirmed:
+                # The upload recorded in the journal is gone from the server
+                self._restart()
+                return
+        else:
+            # The first chunk may have created the upload before failing
+            server_offset, self.upload_id = self.client._get_upload_info(
+                self.build_path
+            )
+        self._confirm_offset(server_offset)
+        progress.update(self.progress_task, completed=self.offset)
+
+    def _send_chunk(self, chunk):
+        try:
+            start_time = time.monotonic()
+            r = self.client._upload_chunk(
+                build_path=self.build_path,
+                chunk=chunk.data,
+                current=chunk.offset,
+                total=self.total_size,
+                upload_id=self.upload_id,
+            )
+        except requests.exceptions.RequestException as exception:
+            raise RetryableUploadException(exception)
+
+        if r.status_code == 200:
+            self.chunk_sizer.record(len(chunk.data), time.monotonic() - start_time)
+        chunk_retry_check(r)
+        return r
+
+    def _handle_response(self, r, chunk):
+        self._handle_chunk_response(r, chunk.data)
+        progress.update(self.progress_task, completed=self.offset)
+
+
+class DeltaUpload:
+    """Sends only the blocks of a build that the server doesn't have yet"""
+
+    def __init__(
+        self, client, build_path, progress_task, hash_obj=None, stop_event=None
+    ):
+        self.client = client
+        self.build_path = build_path
+        self.progress_task = progress_task
+        self.hash_obj = hash_obj
+        self.stop_event = stop_event
+        self.total_size = os.path.getsize(build_path)
+        self.build_fd = None
+
+    def run(self):
+        blocks = find_blocks(self.build_path, self.hash_obj)
+        digests = list(dict.fromkeys(block.digest for block in blocks))
+        missing = self._retry(self.client._get_missing_blocks, digests)
+        if missing is None:
+            raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+
+        # Blocks that appear more than once only have to be sent once
+        missing_blocks = {}
+        for block in blocks:
+            if block.digest in missing:
+                missing_blocks.setdefault(block.digest, block)
+        missing_size = sum(block.size for block in missing_blocks.values())
+        logger.debug(
+            f"Sending {len(missing_blocks)} of {len(blocks)} blocks of "
+            f"{self.build_path}, {missing_size} of {self.total_size} bytes"
+        )
+        progress.update(self.progress_task, completed=self.total_size - missing_size)
+
+        self.build_fd = os.open(self.build_path, os.O_RDONLY)
+        try:
+            self._send_blocks(missing_blocks.values())
+        finally:
+            os.close(self.build_fd)
+
+        return self._retry(self.client._create_delta_upload, self.build_path, blocks)
+
+    def _send_blocks(self, blocks):
+        executor = ThreadPoolExecutor(max_workers=self.client.upload_window_size)
+        futures = [executor.submit(self._send_block, block) for block in blocks]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # Don't send the remaining blocks if one of them failed
+            executor.shutdown(cancel_futures=True)
+            raise
+        executor.shutdown()
+
+    def _send_block(self, block):
+        self._check_stopped()
+        data = os.pread(self.build_fd, block.size, block.offset)
+        self._retry(self.client._upload_block, block.digest, data)
+        progress.advance(self.progress_task, block.size)
+
+    def _retry(self, send, *args):
+        """Sends a request, retrying connection and server errors with backoff"""
+        attempt = 0
+        while True:
+            try:
+                return send(*args)
+            except RetryableUploadException as exception:
+                attempt += 1
+                if attempt > self.client.chunk_retry_count:
+                    raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
+
+                delay = get_retry_delay(attempt)
+                logger.debug(
+                    f"Delta upload of {self.build_path} failed: {exception}. "
+                    f"Retrying in {delay:.1f} seconds"
+                )
+                sleep_unless_stopped(delay, self.stop_event)
+                self._check_stopped()
+
+    def _check_stopped(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise UploadException(UPLOAD_INTERRUPTED_MSG)
+
+
+def sleep_unless_stopped(delay, stop_event=None):
+    """Sleeps for delay seconds, waking up early once stop_event is set"""
+    if stop_event is None:
+        time.sleep(delay)
+    else:
+        stop_event.wait(delay)
+
+
+def get_retry_delay(attempt):
+    """Returns a random delay below the exponential backoff for the given attempt"""
+    return random.uniform(
+        0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1))
+    )
+
+
+def find_upload_attempt(attempts, build_path):
+    """Returns the offset and ID of an unfinished upload of the build, if any"""
+    current_byte = 0
+    upload_id = ""
+    for attempt in attempts:
+        if os.path.basename(build_path) == attempt["filename"]:
+            logger.debug(
+                f"Found a previous upload attempt for the build {build_path}, "
+                f"created on {attempt['created_at']}",
+            )
+            current_byte = attempt["offset"]
+            upload_id = attempt["id"]
+    return current_byte, upload_id
+
+
+def find_upload_offset(attempts, upload_id):
+    for attempt in attempts:
+        if upload_id == attempt["id"]:
+            return attempt["offset"]
+    return None
+
+
+def create_chunk_sizer(info, min_chunk_size, max_chunk_size):
+    if server_max_chunk_size := info.get("shippy_upload_max_chunk_size"):
+        max_chunk_size = min(max_chunk_size, int(server_max_chunk_size))
+    return ChunkSizer(min_chunk_size, max_chunk_size)
+
+
+def supports_build_lookup(server_version):
+    return server_version >= semver.VersionInfo.parse(build_lookup_server_version)
+
+
+def get_build_exists_url(build_path, checksum_type, checksum):
+    query = urllib.parse.urlencode(
+        {"filename": os.path.basename(build_path), checksum_type: checksum}
+    )
+    return f"/api/v1/maintainers/build/exists/?{query}"
+
+
+def build_exists_check(r):
+    # Lookups that fail are treated as the build not existing, so the upload goes ahead
+    try:
+        return r.status_code == 200 and r.json()["exists"]
+    except (KeyError, ValueError):
+        return False
+
+
+def get_chunk_request(token, build_path, chunk, current, total, upload_id):
+    """Returns the URL, headers and body of the request that uploads a chunk"""
+    if upload_id:
+        url = f"/api/v1/maintainers/chunked_upload/{upload_id}/"
+    else:
+        url = "/api/v1/maintainers/chunked_upload/"
+
+    # Stream the chunk straight from its buffer instead of letting the HTTP library
+    # copy it into an in-memory multipart body
+    body = MultipartBody(
+        fields={"filename": os.path.basename(build_path)},
+        file_field="file",
+        data=chunk,
+    )
+    headers = get_request_header(token, chunk, current, total)
+    headers["Content-Type"] = body.content_type
+    headers["Content-Length"] = str(len(body))
+    return url, headers, body
+
+
+def chunk_retry_check(r):
+    if r.status_code in RETRYABLE_STATUS_CODES:
+        raise RetryableUploadException(f"Server returned {r.status_code}")
+
+
+def disable_build_check(r, upload_id):
+    if r.status_code == 200:
+        print(f"Build {upload_id} has been disabled.")
+    else:
+        raise Exception("There was a problem disabling the build.")
+
+
+def get_request_header(token, chunk=None, current=None, total=None):
+    header = {
+        "User-Agent": f"shippy {__version__}",
+        "Authorization": f"Token {token}",
+    }
+
+    if chunk is not None and current is not None and total is not None:
+        header[
+            "Content-Range"
+        ] = f"bytes {current}-{current + len(chunk) - 1}/{total}"
+
+    return header
+
+
+def get_token_from_login_response(r, is_url_secure):
+    """Returns the token from a login response, raising LoginException on failure"""
+    match r.status_code:
+        case 200:
+            token = r.json()["token"]
+
+            if token == b"":
+                raise LoginException("Server returned an empty token.")
+            else:
+                return token
+        case 301:
+            if not is_url_secure:
+                raise LoginException("Server uses HTTPS, but was supplied HTTP URL.")
+        case 400:
+            if r.json()["error"] == "blank_username_or_password":
+                raise LoginException("Username or password must not be blank.")
+        case 404:
+            if r.json()["error"] == "invalid_credential":
+                raise LoginException("Invalid credentials!")
+        case 502:
+            raise LoginException("The gateway server is currently unavailable.")
+        case 503:
+            raise LoginException("The server is temporarily unavailable.")
+        case _:
+            handle_undefined_response(r)
+    return None
+
+
 def handle_undefined_response(request):
     """Handles undefined responses sent back by the server"""
     try:
@@ -359,45 +1131,17 @@ def upload_handle_4xx_response(chunk_request):
         raise UploadException(UNKNOWN_UPLOAD_ERROR_MSG)
 
 
-def get_hash_of_file(filename, checksum_type):
-    if checksum_type.lower() == "md5":
-        hash_obj = hashlib.md5()
-    elif checksum_type.lower() == "sha256":
-        hash_obj = hashlib.sha256()
-    else:
-        # Unsupported checksum type
-        return None
-
-    with open(filename, "rb") as file:
-        content = file.read()
-        hash_obj.update(content)
-    return hash_obj.hexdigest()
-
-
-def get_hash_from_checksum_file(checksum_file):
-    with open(checksum_file, "r") as checksum_file_raw:
-        line = checksum_file_raw.readline()
-        values = line.split(" ")
-        return values[0]
+def upload_exception_check(request, build_file):
+    finalize_exception_check(request)
+    print_upload_success(build_file)
 
 
-def find_checksum_file(filename):
-    valid_checksum_types = ["md5", "sha256"]
-    has_checksum_file_type = None
-    has_sum_postfix = False
-    for checksum_type in valid_checksum_types:
-        if os.path.isfile(f"{filename}.{checksum_type}"):
-            has_checksum_file_type = checksum_type
-            has_sum_postfix = False
-        elif os.path.isfile(f"{filename}.{checksum_type}sum"):
-            has_checksum_file_type = checksum_type
-            has_sum_postfix = True
-    return has_checksum_file_type, has_sum_postfix
+def print_upload_success(build_file):
+    print(f"Successfully uploaded the build {build_file}!")
 
 
-def upload_exception_check(request, build_file):
+def finalize_exception_check(request):
     if request.status_code == 200:
-        print(f"Successfully uploaded the build {build_file}!")
         return
     elif int(request.status_code / 100) == 4:
         try:
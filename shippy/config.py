@@ -27,6 +27,20 @@ def get_optional_true_config_value(section, key):
         return False
 
 
+def get_optional_config_value(section, key, default):
+    try:
+        return config[section][key]
+    except KeyError:
+        return default
+
+
+def get_optional_int_config_value(section, key, default):
+    try:
+        return int(config[section][key])
+    except (KeyError, ValueError):
+        return default
+
+
 def set_config_value(section, key, value):
     config_init()
     config[section][key] = value
@@ -47,3 +61,7 @@ def config_init():
 def config_save():
     with open(CONFIGURATION_FILE, "w+") as config_file:
         config.write(config_file)
+
+
+def get_config_sections(prefix):
+    return [section for section in config.sections() if section.startswith(prefix)]
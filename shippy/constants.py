@@ -60,6 +60,10 @@ FAILED_TO_RETRIEVE_SERVER_VERSION_ERROR_MSG = (
 FAILED_TO_LOG_IN_ERROR_MSG = "Failed to log into server! "
 UNKNOWN_UPLOAD_START_ERROR_MSG = "Something went wrong starting the upload."
 UNKNOWN_UPLOAD_ERROR_MSG = "Something went wrong during the upload."
+UPLOAD_INTERRUPTED_MSG = "The upload was interrupted."
+CHUNK_TOO_LARGE_ERROR_MSG = (
+    "The server rejected a chunk as too large, even at the minimum chunk size."
+)
 
 UNHANDLED_EXCEPTION_MSG = """\
 shippy crashed for an unknown reason. :(
@@ -71,5 +75,104 @@ Request response: {}
 ---
 """
 
-# Chunk size MUST be at 1 MB, as nginx defaults limit request size to that (or less)
+# Chunks start out at 1 MB, as nginx defaults limit request size to that (or less).
+# They only grow past that when the link is fast enough, up to DEFAULT_MAX_CHUNK_SIZE
+# or the limit reported by the server, and shrink again if the server rejects them.
 CHUNK_SIZE = 1000000
+DEFAULT_MAX_CHUNK_SIZE = 16 * CHUNK_SIZE
+
+# Chunks are sized so each request takes around this many seconds
+CHUNK_TARGET_DURATION = 2
+
+# Connection pool and timeout defaults for the HTTP session. The read timeout has to
+# be generous enough to cover the server processing a build on finalization.
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+
+# Size of the reusable buffer used when hashing builds
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Number of chunks kept in flight at once. Servers that require chunks in order still
+# work with a larger window, as shippy falls back to sending one chunk at a time.
+DEFAULT_UPLOAD_WINDOW_SIZE = 1
+
+# Number of times a chunk is resent after a connection error or server error without
+# the upload making any progress, and the total number of retries allowed per build
+DEFAULT_CHUNK_RETRY_COUNT = 5
+DEFAULT_UPLOAD_RETRY_COUNT = 20
+
+# Retries back off exponentially from the base delay up to the maximum delay, in
+# seconds. The actual delay is picked at random below that, so concurrent uploads don't
+# all retry at the same moment.
+RETRY_BACKOFF_BASE = 1
+RETRY_BACKOFF_MAX = 60
+
+# Number of builds uploaded at the same time
+DEFAULT_UPLOAD_CONCURRENCY = 1
+
+# Order in which builds are uploaded: as detected, smallest first, or in the order of
+# the upload variants reported by the server
+UPLOAD_ORDERS = ["detected", "smallest", "variant"]
+
+# Number of chunks read from disk ahead of the one being uploaded
+CHUNK_PREFETCH_COUNT = 2
+
+# The latest shippy release is looked up on GitHub at most once per this many seconds
+GITHUB_LATEST_RELEASE_URL = (
+    "https://api.github.com/repos/shipperstack/shippy/releases/latest"
+)
+DEFAULT_UPDATE_CHECK_TTL = 24 * 60 * 60
+UPDATE_CHECK_TIMEOUT = 5
+
+# Number of build hashes remembered between runs, so unchanged builds aren't hashed
+# again when shippy is rerun
+DEFAULT_CHECKSUM_CACHE_SIZE = 256
+
+# Number of builds hashed at the same time while validating them
+DEFAULT_VALIDATION_WORKERS = 4
+
+# Checksum files accepted next to builds, with either a .<type> or .<type>sum extension
+CHECKSUM_FILE_TYPES = ["md5", "sha256"]
+
+# In watch mode, builds are only uploaded once they and their checksum files haven't
+# changed for this many seconds. Without inotify, directories are scanned for new
+# builds every poll interval.
+DEFAULT_WATCH_SETTLE_TIME = 10
+DEFAULT_WATCH_POLL_INTERVAL = 5
+
+# Once rate limited, requests are paced to this fraction of the rate the server allowed,
+# as estimated from the requests sent within the window, in seconds. Requests are
+# retried this many times after being rate limited, waiting for the default when the
+# server doesn't say how long.
+RATE_LIMIT_WINDOW = 60
+RATE_LIMIT_SAFETY_FACTOR = 0.9
+RATE_LIMIT_RETRY_COUNT = 10
+RATE_LIMIT_DEFAULT_WAIT = 5
+
+# While uploading, the resume journal is saved at most once per this many seconds, and
+# a digest of the uploaded part is recorded every checkpoint interval, in bytes
+JOURNAL_SAVE_INTERVAL = 1
+JOURNAL_CHECKPOINT_INTERVAL = 64 * 1024 * 1024
+
+# Delta uploads split builds into content-defined blocks between these sizes, in bytes.
+# A block ends after this many bytes in a row that count towards a boundary, which
+# makes blocks around 2 MiB long on average in compressed data.
+DELTA_MIN_BLOCK_SIZE = 512 * 1024
+DELTA_MAX_BLOCK_SIZE = 8 * 1024 * 1024
+DELTA_BOUNDARY_RUN = 20
+
+# Mirrors are configured in sections named like [mirror:backup], with their own server
+# and token. Builds uploaded to several servers at once are read only once, and up to
+# this many bytes are buffered for servers that are behind the others.
+MIRROR_SECTION_PREFIX = "mirror:"
+DEFAULT_MIRROR_BUFFER_SIZE = 128 * 1024 * 1024
+
+# Zip integrity checks decompress entries this many bytes at a time. Anything after the
+# last entry is kept in memory to check the central directory, up to this many bytes.
+ZIP_CHECK_INFLATE_SIZE = 1024 * 1024
+ZIP_CHECK_MAX_TAIL_SIZE = 64 * 1024 * 1024
+
+# Builds that passed the zip integrity check are remembered in the checksum cache under
+# this type
+ZIP_CHECK_CACHE_TYPE = "zip"
@@ -0,0 +1,67 @@
+import hashlib
+
+from .constants import DELTA_BOUNDARY_RUN, DELTA_MAX_BLOCK_SIZE, DELTA_MIN_BLOCK_SIZE
+
+# Half of all byte values count towards a block boundary, picked by a fixed permutation
+# so boundaries are spread evenly no matter which bytes are common in a build. This
+# must never change, or the blocks of earlier builds can't be matched anymore.
+BOUNDARY_TABLE = bytes(
+    1 if (value * 167 + 13) % 256 < 128 else 0 for value in range(256)
+)
+BOUNDARY_MARKER = b"\x01" * DELTA_BOUNDARY_RUN
+
+
+class Block:
+    def __init__(self, offset, size, digest):
+        self.offset = offset
+        self.size = size
+        self.digest = digest
+
+
+def find_blocks(path, hash_obj=None):
+    """Splits the file into content-defined blocks, with the SHA-256 digest of each"""
+    blocks = []
+    offset = 0
+    pending = bytearray()
+    start = 0
+    end_of_file = False
+    with open(path, "rb", buffering=0) as file:
+        while True:
+            if not end_of_file and len(pending) - start < DELTA_MAX_BLOCK_SIZE:
+                # Drop the blocks that are done before reading more
+                del pending[:start]
+                start = 0
+                data = file.read(DELTA_MAX_BLOCK_SIZE)
+                if data:
+                    pending += data
+                else:
+                    end_of_file = True
+                continue
+
+            if start == len(pending):
+                return blocks
+
+            with memoryview(pending) as view:
+                size = find_block_size(view[start:])
+                block = view[start : start + size]
+                blocks.append(Block(offset, size, hashlib.sha256(block).hexdigest()))
+                if hash_obj is not None:
+                    hash_obj.update(block)
+                block.release()
+
+            start += size
+            offset += size
+
+
+def find_block_size(data):
+    """Returns the size of the block at the start of data"""
+    if len(data) <= DELTA_MIN_BLOCK_SIZE:
+        return len(data)
+
+    # Translating the bytes and searching for a run of boundary bytes both happen in C,
+    # which is many times faster than updating a rolling hash for every byte in Python
+    window = data[DELTA_MIN_BLOCK_SIZE - DELTA_BOUNDARY_RUN : DELTA_MAX_BLOCK_SIZE]
+    position = bytes(window).translate(BOUNDARY_TABLE).find(BOUNDARY_MARKER)
+    if position == -1:
+        return min(len(data), DELTA_MAX_BLOCK_SIZE)
+    return DELTA_MIN_BLOCK_SIZE + position
@@ -0,0 +1,51 @@
+import fnmatch
+import os.path
+import re
+
+from loguru import logger
+
+from .checksum import find_checksum_file
+
+
+def is_excluded(name, path, exclude_patterns):
+    return any(
+        fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern)
+        for pattern in exclude_patterns
+    )
+
+
+def discover_builds(regex_pattern, roots=(".",), recursive=False, exclude_patterns=()):
+    """Returns the builds in the given directories, mapped to their checksum files"""
+    pattern = re.compile(regex_pattern)
+    builds = {}
+    visited_directories = set()
+    directories = list(roots)
+    while directories:
+        directory = directories.pop()
+
+        # Symlinked directories could otherwise be visited more than once, or forever
+        real_directory = os.path.realpath(directory)
+        if real_directory in visited_directories:
+            continue
+        visited_directories.add(real_directory)
+
+        try:
+            with os.scandir(directory) as scanner:
+                entries = list(scanner)
+        except OSError as exception:
+            logger.debug(f"Failed to list {directory}: {exception}")
+            continue
+
+        names = {entry.name for entry in entries}
+        for entry in entries:
+            path = os.path.normpath(entry.path)
+            if is_excluded(entry.name, path, exclude_patterns):
+                continue
+
+            if entry.is_dir():
+                if recursive:
+                    directories.append(path)
+            elif entry.name.endswith(".zip") and pattern.search(entry.name):
+                builds[path] = find_checksum_file(path, names)
+
+    return dict(sorted(builds.items()))
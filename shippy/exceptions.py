@@ -4,3 +4,19 @@ class LoginException(Exception):
 
 class UploadException(Exception):
     pass
+
+
+class RetryableUploadException(UploadException):
+    pass
+
+
+class ValidationException(Exception):
+    pass
+
+
+class DuplicateBuildException(ValidationException):
+    pass
+
+
+class CorruptBuildException(ValidationException):
+    pass
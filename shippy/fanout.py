@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .checksum import get_hashes_of_file
+from .constants import CHUNK_PREFETCH_COUNT, DEFAULT_MIRROR_BUFFER_SIZE
+from .exceptions import UploadException
+from .reader import SharedChunkReader
+
+
+def upload_to_servers(
+    clients,
+    build_path,
+    hashes=None,
+    buffer_size=DEFAULT_MIRROR_BUFFER_SIZE,
+    stop_event=None,
+    on_uploaded=None,
+):
+    """Uploads a build to several servers at the same time, reading it only once"""
+    checksum_types = [client.get_checksum_type().lower() for client in clients]
+    hashes = dict(hashes or {})
+    if any(checksum_type not in hashes for checksum_type in checksum_types):
+        hashes.update(get_hashes_of_file(build_path, checksum_types))
+
+    # Every upload cuts its chunks out of the segments, so they're as large as the
+    # largest chunk any server may get
+    segment_size = max(client.get_chunk_sizer().max_size for client in clients)
+    # Every chunk in flight holds on to its segment until it's sent
+    buffer_count = max(
+        buffer_size // segment_size,
+        sum(client.upload_window_size for client in clients) + CHUNK_PREFETCH_COUNT,
+    )
+
+    results = {}
+    with SharedChunkReader(build_path, segment_size, buffer_count) as source:
+        with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+            uploads = {
+                executor.submit(
+                    client.upload_chunks,
+                    build_path,
+                    hashes.get(checksum_type),
+                    source,
+                    stop_event,
+                ): client
+                for client, checksum_type in zip(clients, checksum_types)
+            }
+            for upload in as_completed(uploads):
+                client = uploads[upload]
+                try:
+                    results[client] = upload.result()
+                except UploadException as exception:
+                    results[client] = exception
+                # Each server can finalize without waiting for the others
+                if on_uploaded is not None:
+                    on_uploaded(client, results[client])
+    return results
@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import Future, wait
+
+from loguru import logger
+from rich.console import Console
+
+from .client import print_upload_success, progress
+from .constants import WAITING_FINALIZATION_MSG
+from .exceptions import UploadException
+from .helper import print_error
+
+console = Console()
+
+
+class BuildFinalizer:
+    """Finalizes uploaded builds in the background, reporting errors per build"""
+
+    def __init__(self, max_workers, disable_builds=False):
+        self.disable_builds = disable_builds
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._finalizations = {}
+        # Guards output, so nothing is printed once shippy was interrupted
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def submit(self, client, build_path, upload_id, checksum):
+        finalization = Future()
+        self._finalizations[finalization] = client.get_build_label(build_path)
+        # Daemon threads don't hold up exiting while the server is still processing
+        threading.Thread(
+            target=self._run,
+            args=(finalization, client, build_path, upload_id, checksum),
+            daemon=True,
+        ).start()
+
+    def _run(self, finalization, *args):
+        with self._slots:
+            if self._stopped or not finalization.set_running_or_notify_cancel():
+                return
+            try:
+                self._finalize(*args)
+            except BaseException as exception:
+                finalization.set_exception(exception)
+            else:
+                finalization.set_result(None)
+
+    def _finalize(self, client, build_path, upload_id, checksum):
+        label = client.get_build_label(build_path)
+        progress_task = progress.add_task(
+            f"[yellow]Waiting for the server to process {label}...", total=None
+        )
+        try:
+            client.finalize_upload(build_path, upload_id, checksum)
+        finally:
+            progress.remove_task(progress_task)
+
+        if self._stopped:
+            return
+        if self.disable_builds:
+            client.disable_build(upload_id=upload_id)
+        with self._lock:
+            if not self._stopped:
+                print_upload_success(label)
+
+    def report_finished(self):
+        """Reports errors of the builds finalized so far, without waiting for others"""
+        for finalization in list(self._finalizations):
+            if finalization.done():
+                self._report(finalization, self._finalizations.pop(finalization))
+
+    def wait(self):
+        """Waits for every build to be finalized and reports any errors"""
+        if any(not finalization.done() for finalization in self._finalizations):
+            with console.status(WAITING_FINALIZATION_MSG):
+                wait(self._finalizations)
+
+        for finalization, label in self._finalizations.items():
+            self._report(finalization, label)
+        self._finalizations = {}
+
+    def cancel(self):
+        """Abandons every finalization and stops reporting them, without waiting"""
+        with self._lock:
+            self._stopped = True
+        for finalization in list(self._finalizations):
+            finalization.cancel()
+        self._finalizations = {}
+
+    def _report(self, finalization, label):
+        try:
+            finalization.result()
+        except UploadException as exception:
+            print_error(f"{label}: {exception}", newline=True, exit_after=False)
+        except Exception as exception:
+            # Unexpected responses, e.g. to disabling the build, only affect this build
+            logger.opt(exception=exception).debug(f"Finalizing {label} failed")
+            print_error(f"{label}: {exception}", newline=True, exit_after=False)
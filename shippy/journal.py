@@ -0,0 +1,32 @@
+import os.path
+
+from .cache import cache_lock, read_cache_file, write_cache_file
+from .config import home_dir
+
+# Constants
+JOURNAL_FILE = f"{home_dir}/.shippy_uploads.json"
+
+
+def get_journal_key(server_url, build_path):
+    return f"{server_url} {os.path.realpath(build_path)}"
+
+
+def get_journal_entry(server_url, build_path):
+    """Returns what was recorded about the last upload of the build to the server"""
+    key = get_journal_key(server_url, build_path)
+    with cache_lock:
+        return read_cache_file(JOURNAL_FILE).get(key)
+
+
+def set_journal_entry(server_url, build_path, entry):
+    with cache_lock:
+        data = read_cache_file(JOURNAL_FILE)
+        data[get_journal_key(server_url, build_path)] = entry
+        write_cache_file(JOURNAL_FILE, data)
+
+
+def remove_journal_entry(server_url, build_path):
+    with cache_lock:
+        data = read_cache_file(JOURNAL_FILE)
+        if data.pop(get_journal_key(server_url, build_path), None) is not None:
+            write_cache_file(JOURNAL_FILE, data)
@@ -0,0 +1,35 @@
+import uuid
+
+
+class MultipartBody:
+    """A multipart/form-data request body that streams the file data without copying"""
+
+    def __init__(self, fields, file_field, data):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = ""
+        for name, value in fields.items():
+            head += (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            )
+        head += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field}"; '
+            f'filename="{file_field}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        )
+
+        self._head = head.encode()
+        self._data = data
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+
+    def __len__(self):
+        return len(self._head) + len(self._data) + len(self._tail)
+
+    def __iter__(self):
+        yield self._head
+        yield self._data
+        yield self._tail
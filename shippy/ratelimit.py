@@ -0,0 +1,114 @@
+import email.utils
+import re
+import threading
+import time
+from collections import deque
+
+from .constants import (
+    RATE_LIMIT_DEFAULT_WAIT,
+    RATE_LIMIT_SAFETY_FACTOR,
+    RATE_LIMIT_WINDOW,
+)
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(server_url):
+    """Returns the rate limiter shared by every client of the given server"""
+    with rate_limiters_lock:
+        if server_url not in rate_limiters:
+            rate_limiters[server_url] = RateLimiter()
+        return rate_limiters[server_url]
+
+
+class RateLimiter:
+    """Paces requests so they stay just under the server's rate limit"""
+
+    def __init__(self):
+        self.rate = None
+        self.capacity = 1
+        self._tokens = 0
+        self._refill_from = time.monotonic()
+        self._blocked_until = 0
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Reserves a request, returning how many seconds to wait before sending it"""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._get_delay(now)
+            self._sent.append(now + delay)
+            self._forget_before(now - RATE_LIMIT_WINDOW)
+            return delay
+
+    def acquire(self):
+        time.sleep(self.reserve())
+
+    def limited(self, retry_after):
+        """Lowers the rate after the server rate limited a request"""
+        with self._lock:
+            now = time.monotonic()
+            self._forget_before(now - RATE_LIMIT_WINDOW)
+
+            period = retry_after
+            if self._sent:
+                period += max(0, now - self._sent[0])
+            estimate = max(
+                len(self._sent) / max(period, 1) * RATE_LIMIT_SAFETY_FACTOR,
+                1 / RATE_LIMIT_WINDOW,
+            )
+            self.rate = estimate if self.rate is None else min(self.rate, estimate)
+            self.capacity = max(1, self.rate)
+            resume_at = now + retry_after
+            self._tokens = 0
+            self._refill_from = max(self._refill_from, resume_at)
+
+            # Requests that were rate limited at the same time only report it once
+            if resume_at <= self._blocked_until:
+                return False
+            self._blocked_until = resume_at
+            return True
+
+    def _get_delay(self, now):
+        delay = max(0, self._blocked_until - now)
+        if self.rate is None:
+            return delay
+
+        # The bucket only starts refilling once requests may resume
+        if now > self._refill_from:
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._refill_from) * self.rate,
+            )
+            self._refill_from = now
+
+        # The bucket goes negative to queue up requests behind each other
+        self._tokens -= 1
+        if self._tokens < 0:
+            delay = max(delay, self._refill_from - now - self._tokens / self.rate)
+        return delay
+
+    def _forget_before(self, timestamp):
+        while self._sent and self._sent[0] < timestamp:
+            self._sent.popleft()
+
+
+def get_retry_after(r):
+    """Returns the number of seconds the server asked to wait for"""
+    retry_after = r.headers.get("Retry-After")
+    if retry_after is not None:
+        if retry_after.strip().isdigit():
+            return int(retry_after)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+            return max(0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    # Older servers only mention the wait in the error message
+    try:
+        return int(re.findall(r"\d+", r.json()["detail"])[0])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return RATE_LIMIT_DEFAULT_WAIT
@@ -0,0 +1,298 @@
+import os
+import queue
+import threading
+
+
+class Chunk:
+    def __init__(self, buffer, offset, size):
+        self.buffer = buffer
+        self.offset = offset
+        self.data = memoryview(buffer)[:size]
+
+
+class ChunkReader:
+    """Reads chunks of a file ahead of time into a pool of reusable buffers"""
+
+    def __init__(self, path, offset, get_chunk_size, buffer_count):
+        self.path = path
+        self.offset = offset
+        self.get_chunk_size = get_chunk_size
+
+        self._free_buffers = queue.Queue()
+        for _ in range(buffer_count):
+            self._free_buffers.put(bytearray())
+        self._ready_chunks = queue.Queue()
+        self._stopped = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def read(self):
+        """Returns the next chunk, or None once the end of the file is reached"""
+        if self._finished:
+            return None
+
+        item = self._ready_chunks.get()
+        if isinstance(item, Exception):
+            raise item
+        if item is None:
+            self._finished = True
+        return item
+
+    def release(self, chunk):
+        self._free_buffers.put(chunk.buffer)
+
+    def close(self):
+        self._stopped.set()
+        # Wake up the reader thread if it is waiting for a free buffer
+        self._free_buffers.put(None)
+        self._thread.join()
+
+    def _read_ahead(self):
+        try:
+            with open(self.path, "rb", buffering=0) as file:
+                file.seek(self.offset)
+                offset = self.offset
+                while not self._stopped.is_set():
+                    buffer = self._free_buffers.get()
+                    if buffer is None:
+                        return
+
+                    chunk_size = self.get_chunk_size()
+                    if len(buffer) < chunk_size:
+                        buffer = bytearray(chunk_size)
+
+                    size = file.readinto(memoryview(buffer)[:chunk_size])
+                    if not size:
+                        self._ready_chunks.put(None)
+                        return
+
+                    self._ready_chunks.put(Chunk(buffer, offset, size))
+                    offset += size
+        except OSError as exception:
+            self._ready_chunks.put(exception)
+
+
+class Segment(Chunk):
+    """A segment of a SharedChunkReader, counting the chunks of it being sent"""
+
+    def __init__(self, buffer, offset, size):
+        super().__init__(buffer, offset, size)
+        self.users = 0
+
+    @property
+    def end(self):
+        return self.offset + len(self.data)
+
+
+class SegmentChunk:
+    """A chunk sent straight from a part of a shared segment"""
+
+    def __init__(self, segment, offset, size):
+        self.segment = segment
+        self.offset = offset
+        start = offset - segment.offset
+        self.data = segment.data[start : start + size]
+
+
+class SharedChunkReader:
+    """Reads a file once for several uploads of it running at the same time"""
+
+    def __init__(self, path, segment_size, buffer_count):
+        self.path = path
+        self.segment_size = segment_size
+
+        # Buffers are only allocated once they're needed, as builds may be smaller
+        self._free_buffers = []
+        self._unallocated_buffers = buffer_count
+        self._segments = {}
+        self._views = set()
+        self._next_offset = 0
+        self._finished = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def open(self, offset, chunk_sizer):
+        """Returns a view for one upload, usable in place of a ChunkReader"""
+        view = SharedChunkView(self, offset, chunk_sizer)
+        with self._condition:
+            self._views.add(view)
+            self._condition.notify_all()
+        return view
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _get_segment(self, view):
+        """Returns the held segment at the view's offset, or None to read it itself"""
+        segment_offset = view.offset - view.offset % self.segment_size
+        with self._condition:
+            while True:
+                segment = self._segments.get(segment_offset)
+                if segment is not None:
+                    segment.users += 1
+                    return segment
+                if self._error is not None:
+                    raise self._error
+                # Only wait for the segment the background thread reads next
+                if segment_offset != self._next_offset or self._finished:
+                    return None
+                view.waiting = True
+                self._condition.notify_all()
+                self._condition.wait()
+                view.waiting = False
+
+    def _release(self, segment):
+        with self._condition:
+            segment.users -= 1
+            self._drop_unneeded_segments()
+            self._condition.notify_all()
+
+    def _close_view(self, view):
+        with self._condition:
+            self._views.discard(view)
+            self._drop_unneeded_segments()
+            self._condition.notify_all()
+
+    def _drop_unneeded_segments(self):
+        for offset, segment in list(self._segments.items()):
+            if segment.users == 0 and all(
+                view.offset >= segment.end for view in self._views
+            ):
+                self._drop_segment(offset)
+
+    def _drop_segment(self, offset):
+        self._free_buffers.append(self._segments.pop(offset).buffer)
+
+    def _take_buffer(self):
+        """Waits for a free buffer for the next segment, or returns None if closed"""
+        with self._condition:
+            while not self._stopped:
+                # Views that are ahead read on their own until the others catch up
+                if any(view.offset <= self._next_offset for view in self._views):
+                    if self._free_buffers:
+                        return self._free_buffers.pop()
+                    if self._unallocated_buffers:
+                        self._unallocated_buffers -= 1
+                        return bytearray(self.segment_size)
+                    if self._drop_oldest_segment():
+                        continue
+                self._condition.wait()
+            return None
+
+    def _drop_oldest_segment(self):
+        """Makes room for the next segment if a view is waiting for it"""
+        if not any(view.waiting for view in self._views):
+            return False
+
+        # Views that fell this far behind read from the file instead
+        unused = [
+            offset for offset, segment in self._segments.items() if segment.users == 0
+        ]
+        if not unused:
+            return False
+        self._drop_segment(min(unused))
+        return True
+
+    def _read_ahead(self):
+        try:
+            with open(self.path, "rb", buffering=0) as file:
+                while True:
+                    buffer = self._take_buffer()
+                    if buffer is None:
+                        return
+
+                    size = file.readinto(buffer)
+                    with self._condition:
+                        if not size:
+                            self._free_buffers.append(buffer)
+                            self._finished = True
+                            self._condition.notify_all()
+                            return
+
+                        segment = Segment(buffer, self._next_offset, size)
+                        self._segments[self._next_offset] = segment
+                        self._next_offset += size
+                        self._drop_unneeded_segments()
+                        self._condition.notify_all()
+        except OSError as exception:
+            with self._condition:
+                self._error = exception
+                self._condition.notify_all()
+
+
+class SharedChunkView:
+    """One upload's reader of a SharedChunkReader"""
+
+    def __init__(self, source, offset, chunk_sizer):
+        self.source = source
+        self.offset = offset
+        self.chunk_sizer = chunk_sizer
+        self.waiting = False
+        self._held_chunks = set()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def read(self):
+        """Returns the next chunk, or None once the end of the file is reached"""
+        size = self.chunk_sizer.get_size()
+        segment = self.source._get_segment(self)
+        if segment is not None:
+            chunk = SegmentChunk(segment, self.offset, size)
+            if chunk.data:
+                self._held_chunks.add(chunk)
+                self.offset += len(chunk.data)
+                return chunk
+            self.source._release(segment)
+
+        # Stop at the next segment, so the shared segments can be used again from there
+        next_segment = self.offset - self.offset % self.source.segment_size
+        next_segment += self.source.segment_size
+        size = min(size, next_segment - self.offset)
+
+        if self._file is None:
+            self._file = open(self.source.path, "rb", buffering=0)
+        data = os.pread(self._file.fileno(), size, self.offset)
+        if not data:
+            return None
+
+        chunk = Chunk(data, self.offset, len(data))
+        self.offset += len(data)
+        return chunk
+
+    def release(self, chunk):
+        if chunk in self._held_chunks:
+            self._held_chunks.remove(chunk)
+            self.source._release(chunk.segment)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        # Chunks that were never released, e.g. because their upload failed
+        for chunk in self._held_chunks:
+            self.source._release(chunk.segment)
+        self._held_chunks = set()
+        self.source._close_view(self)
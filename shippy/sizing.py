@@ -0,0 +1,45 @@
+import threading
+
+from .constants import CHUNK_TARGET_DURATION
+
+
+class ChunkSizer:
+    """Sizes chunks so each takes around CHUNK_TARGET_DURATION seconds to send"""
+
+    def __init__(self, min_size, max_size):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.size = min_size
+        self._throughput = None
+        self._lock = threading.Lock()
+
+    def get_size(self):
+        with self._lock:
+            return self.size
+
+    def record(self, size, elapsed):
+        if elapsed <= 0:
+            return
+
+        with self._lock:
+            throughput = size / elapsed
+            if self._throughput is None:
+                self._throughput = throughput
+            else:
+                # Smooth out single fast or slow chunks
+                self._throughput = 0.7 * self._throughput + 0.3 * throughput
+
+            target = int(self._throughput * CHUNK_TARGET_DURATION)
+            # Grow at most twofold at a time so the server's limit is found gradually
+            target = min(target, self.size * 2)
+            self.size = min(max(target, self.min_size), self.max_size)
+
+    def shrink(self, rejected_size):
+        """Lowers the upper bound below a rejected size, or returns False if it can't"""
+        with self._lock:
+            if rejected_size <= self.min_size:
+                return False
+
+            self.max_size = max(self.min_size, rejected_size // 2)
+            self.size = min(self.size, self.max_size)
+            return True
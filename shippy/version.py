@@ -1,3 +1,6 @@
 __version__ = "1.11.1"
 
 server_compat_version = "2.14.0"
+
+# First server version that can look up whether it already has a build
+build_lookup_server_version = "2.15.0"
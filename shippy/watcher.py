@@ -0,0 +1,131 @@
+import os
+import time
+
+from loguru import logger
+
+from .discovery import discover_builds
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+class BuildWatcher:
+    """Watches directories for builds that appear after it is started"""
+
+    def __init__(
+        self,
+        regex_pattern,
+        roots,
+        settle_time,
+        poll_interval,
+        recursive=False,
+        exclude_patterns=(),
+    ):
+        self.regex_pattern = regex_pattern
+        self.roots = roots
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.recursive = recursive
+        self.exclude_patterns = exclude_patterns
+
+        self._inotify = None
+        self._pending = {}
+        self._handled = {}
+
+    def __enter__(self):
+        if INotify is not None:
+            self._inotify = INotify()
+            mask = (
+                flags.CREATE
+                | flags.CLOSE_WRITE
+                | flags.MOVED_TO
+                | flags.DELETE
+                | flags.MOVED_FROM
+            )
+            for root in self.roots:
+                self._inotify.add_watch(root, mask)
+
+        # Builds that are already there when watching starts are left alone
+        for build_path, checksum_file in self._scan().items():
+            self._handled[build_path] = get_build_state(build_path, checksum_file)
+        return self
+
+    def __exit__(self, *_):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def watch(self):
+        """Yields lists of the builds ready to be uploaded, which may be empty"""
+        while True:
+            self._update_pending(self._scan())
+            yield self._pop_settled()
+            self._wait()
+
+    def _scan(self):
+        builds = discover_builds(
+            self.regex_pattern,
+            roots=self.roots,
+            recursive=self.recursive,
+            exclude_patterns=self.exclude_patterns,
+        )
+        return {
+            build_path: checksum_file
+            for build_path, checksum_file in builds.items()
+            if checksum_file[0] is not None
+        }
+
+    def _update_pending(self, builds):
+        now = time.monotonic()
+        pending = {}
+        for build_path, checksum_file in builds.items():
+            state = get_build_state(build_path, checksum_file)
+            if state is None or self._handled.get(build_path) == state:
+                continue
+
+            previous = self._pending.get(build_path)
+            if previous is not None and previous[1] == state:
+                pending[build_path] = previous
+            else:
+                # Still being written, or new: wait for it to settle from now on
+                pending[build_path] = (checksum_file, state, now)
+        self._pending = pending
+
+    def _pop_settled(self):
+        now = time.monotonic()
+        settled = []
+        for build_path, (checksum_file, state, changed_at) in list(
+            self._pending.items()
+        ):
+            if now - changed_at >= self.settle_time:
+                del self._pending[build_path]
+                self._handled[build_path] = state
+                settled.append((build_path, checksum_file))
+        return settled
+
+    def _wait(self):
+        # Pending builds are checked again every second until they settle
+        timeout = min(self.poll_interval, 1) if self._pending else self.poll_interval
+        if self._inotify is None:
+            time.sleep(timeout)
+            return
+
+        events = self._inotify.read(timeout=int(timeout * 1000))
+        logger.debug(f"Received {len(events)} inotify event(s)")
+
+
+def get_build_state(build_path, checksum_file):
+    """Returns the size and modification time of the build and its checksum file"""
+    try:
+        build_stat = os.stat(build_path)
+        checksum_stat = os.stat(checksum_file[1])
+    except OSError:
+        return None
+    return (
+        build_stat.st_size,
+        build_stat.st_mtime_ns,
+        checksum_stat.st_size,
+        checksum_stat.st_mtime_ns,
+    )
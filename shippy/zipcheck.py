@@ -0,0 +1,395 @@
+import struct
+import zipfile
+import zlib
+
+from loguru import logger
+
+from .constants import ZIP_CHECK_INFLATE_SIZE, ZIP_CHECK_MAX_TAIL_SIZE
+from .exceptions import CorruptBuildException
+
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+ZIP64_END_SIGNATURE = b"PK\x06\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+END_SIGNATURE = b"PK\x05\x06"
+
+LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+CENTRAL_HEADER = struct.Struct("<4s6H3I5H2I")
+ZIP64_END = struct.Struct("<4sQ2H2I4Q")
+ZIP64_LOCATOR = struct.Struct("<4sIQI")
+END = struct.Struct("<4s4H2IH")
+
+ZIP64_EXTRA_ID = 0x0001
+HAS_DATA_DESCRIPTOR = 0x08
+STORED = 0
+DEFLATED = 8
+
+
+class ZipEntry:
+    def __init__(self, offset, name, flags, method, crc, compressed_size, size, zip64):
+        self.offset = offset
+        self.name = name
+        self.flags = flags
+        self.method = method
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+        self.zip64 = zip64
+
+        # What was actually found in the build
+        self.actual_crc = 0
+        self.actual_compressed_size = 0
+        self.actual_size = 0
+
+    def has_data_descriptor(self):
+        return bool(self.flags & HAS_DATA_DESCRIPTOR)
+
+
+class ZipVerifier:
+    """Checks that a zip file is intact while it's read for hashing"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._streamable = True
+        self._position = 0
+        self._pending = bytearray()
+        self._header_offset = 0
+        self._entry = None
+        self._remaining = None
+        self._decompressor = None
+        self._in_data = False
+        self._tail = None
+        self._tail_offset = None
+
+    def update(self, data):
+        data = memoryview(data)
+        while data and self._streamable:
+            if self._tail is not None:
+                self._add_to_tail(data)
+                return
+
+            if self._in_data:
+                used = self._read_data(data)
+            else:
+                used = self._read_header(data)
+            self._position += used
+            data = data[used:]
+
+    def finish(self):
+        if not self._streamable:
+            self._check_with_zipfile()
+            return
+
+        if self._tail is None:
+            raise CorruptBuildException(
+                "This build is truncated, as it has no central directory."
+            )
+
+        tail = bytes(self._tail)
+        directory_offset, directory_size, entry_count = self._find_end(tail)
+        start = directory_offset - self._tail_offset
+        if start < 0 or start + directory_size > len(tail):
+            raise CorruptBuildException("This build's central directory is misplaced.")
+
+        directory = tail[start : start + directory_size]
+        found = self._check_directory(directory)
+        if found != entry_count:
+            raise CorruptBuildException(
+                f"This build's central directory lists {found} of {entry_count} "
+                "entries."
+            )
+
+    def _read_header(self, data):
+        """Reads a local header or a data descriptor, returning the bytes used"""
+        if not self._pending:
+            self._header_offset = self._position
+
+        # Headers can be split between blocks, so they're collected until complete
+        used = 0
+        while needed := self._parse_header():
+            if used == len(data):
+                break
+            size = min(needed - len(self._pending), len(data) - used)
+            self._pending += data[used : used + size]
+            used += size
+        return used
+
+    def _parse_header(self):
+        """Parses the pending bytes, returning how many are needed if not enough"""
+        if self._entry is not None:
+            return self._parse_data_descriptor()
+
+        if len(self._pending) < 4:
+            return 4
+        if self._pending[:4] != LOCAL_HEADER_SIGNATURE:
+            # Anything else is the central directory or something before it, which is
+            # checked once the end is found
+            self._start_tail()
+            return 0
+        if len(self._pending) < LOCAL_HEADER.size:
+            return LOCAL_HEADER.size
+
+        header = LOCAL_HEADER.unpack_from(self._pending)
+        _, _, flags, method, _, _, crc, compressed_size, size, name_size, extra_size = (
+            header
+        )
+        header_size = LOCAL_HEADER.size + name_size + extra_size
+        if len(self._pending) < header_size:
+            return header_size
+
+        offset = self._header_offset
+        name = bytes(self._pending[LOCAL_HEADER.size :][:name_size])
+        extra = bytes(self._pending[LOCAL_HEADER.size + name_size : header_size])
+        zip64 = get_zip64_extra(extra)
+        if zip64 is not None:
+            values = iter(zip64)
+            size = next(values, size) if size == 0xFFFFFFFF else size
+            if compressed_size == 0xFFFFFFFF:
+                compressed_size = next(values, compressed_size)
+
+        entry = ZipEntry(
+            offset,
+            name.decode("utf-8", "replace"),
+            flags,
+            method,
+            crc,
+            compressed_size,
+            size,
+            zip64 is not None,
+        )
+        self.entries[offset] = entry
+        self._pending.clear()
+        self._start_data(entry)
+        return 0
+
+    def _parse_data_descriptor(self):
+        entry = self._entry
+        size_format = "<IQQ" if entry.zip64 else "<III"
+        descriptor_size = struct.calcsize(size_format)
+
+        if len(self._pending) < 4:
+            return 4
+        if self._pending[:4] == DATA_DESCRIPTOR_SIGNATURE:
+            descriptor_size += 4
+        if len(self._pending) < descriptor_size:
+            return descriptor_size
+
+        entry.crc, entry.compressed_size, entry.size = struct.unpack_from(
+            size_format, self._pending, descriptor_size - struct.calcsize(size_format)
+        )
+        self._pending.clear()
+        self._entry = None
+        check_entry(entry)
+        return 0
+
+    def _start_data(self, entry):
+        self._entry = entry
+        self._in_data = True
+        if entry.method == DEFLATED:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            # The end of the deflate stream marks the end of the data when the sizes
+            # only follow in the data descriptor
+            self._remaining = (
+                None if entry.has_data_descriptor() else entry.compressed_size
+            )
+        elif entry.has_data_descriptor():
+            # Without its size, the end of stored data can't be found, so the zip is
+            # checked with zipfile once the read is done
+            logger.debug(f"{self.path} can't be checked while reading it")
+            self._streamable = False
+        else:
+            self._decompressor = None
+            self._remaining = entry.compressed_size
+
+    def _read_data(self, data):
+        """Checks the data of the current entry, returning the bytes used"""
+        entry = self._entry
+        if self._remaining is not None:
+            data = data[: self._remaining]
+
+        if self._decompressor is not None:
+            used = self._inflate(data)
+            if self._remaining is not None and used < len(data):
+                raise CorruptBuildException(
+                    f"This build's entry {entry.name} is longer than its data."
+                )
+        else:
+            used = len(data)
+            if entry.method == STORED:
+                entry.actual_crc = zlib.crc32(data, entry.actual_crc)
+                entry.actual_size += used
+        entry.actual_compressed_size += used
+
+        if self._remaining is not None:
+            self._remaining -= used
+            if self._remaining == 0:
+                self._finish_data()
+        elif self._decompressor.eof:
+            self._finish_data()
+        return used
+
+    def _inflate(self, data):
+        entry = self._entry
+        decompressor = self._decompressor
+        used = 0
+        try:
+            # Limit the output of each step, so highly compressed entries don't have to
+            # be decompressed into memory all at once
+            while data and not decompressor.eof:
+                output = decompressor.decompress(data, ZIP_CHECK_INFLATE_SIZE)
+                entry.actual_crc = zlib.crc32(output, entry.actual_crc)
+                entry.actual_size += len(output)
+                if decompressor.eof:
+                    used += len(data) - len(decompressor.unused_data)
+                    break
+                used += len(data) - len(decompressor.unconsumed_tail)
+                data = decompressor.unconsumed_tail
+        except zlib.error as exception:
+            raise CorruptBuildException(
+                f"This build's entry {entry.name} is corrupt: {exception}"
+            )
+        return used
+
+    def _finish_data(self):
+        entry = self._entry
+        self._in_data = False
+        if self._decompressor is not None:
+            decompressor = self._decompressor
+            while not decompressor.eof and (output := decompressor.flush()):
+                entry.actual_crc = zlib.crc32(output, entry.actual_crc)
+                entry.actual_size += len(output)
+            if not decompressor.eof:
+                raise CorruptBuildException(
+                    f"This build's entry {entry.name} ends too early."
+                )
+            self._decompressor = None
+
+        if not entry.has_data_descriptor():
+            self._entry = None
+            check_entry(entry)
+
+    def _check_with_zipfile(self):
+        try:
+            with zipfile.ZipFile(self.path) as build_zip:
+                corrupt_entry = build_zip.testzip()
+        except (zipfile.BadZipFile, zlib.error, EOFError) as exception:
+            raise CorruptBuildException(f"This build is corrupt: {exception}")
+        if corrupt_entry is not None:
+            raise CorruptBuildException(
+                f"This build's entry {corrupt_entry} is corrupt."
+            )
+
+    def _start_tail(self):
+        self._tail = bytearray()
+        self._tail_offset = self._header_offset
+        pending = bytes(self._pending)
+        self._pending.clear()
+        self._add_to_tail(pending)
+
+    def _add_to_tail(self, data):
+        if len(self._tail) + len(data) > ZIP_CHECK_MAX_TAIL_SIZE:
+            raise CorruptBuildException(
+                f"This build has unexpected data at offset {self._tail_offset}."
+            )
+        self._tail += data
+
+    def _find_end(self, tail):
+        """Returns the offset, size and entry count of the central directory"""
+        # The end record is followed only by its comment
+        position = tail.rfind(END_SIGNATURE)
+        while position != -1:
+            if position + END.size <= len(tail):
+                comment_size = END.unpack_from(tail, position)[-1]
+                if position + END.size + comment_size == len(tail):
+                    break
+            position = tail.rfind(END_SIGNATURE, 0, position)
+        else:
+            raise CorruptBuildException(
+                "This build is truncated, as it has no end of central directory."
+            )
+
+        _, _, _, _, entry_count, directory_size, directory_offset, _ = END.unpack_from(
+            tail, position
+        )
+        locator_position = position - ZIP64_LOCATOR.size
+        if (
+            locator_position >= 0
+            and tail[locator_position:position][:4] == ZIP64_LOCATOR_SIGNATURE
+        ):
+            _, _, end_offset, _ = ZIP64_LOCATOR.unpack_from(tail, locator_position)
+            end_position = end_offset - self._tail_offset
+            if (
+                end_position < 0
+                or tail[end_position : end_position + 4] != ZIP64_END_SIGNATURE
+            ):
+                raise CorruptBuildException("This build's zip64 end record is missing.")
+            values = ZIP64_END.unpack_from(tail, end_position)
+            entry_count, directory_size, directory_offset = values[7:]
+        return directory_offset, directory_size, entry_count
+
+    def _check_directory(self, directory):
+        """Checks every central directory entry, returning how many there are"""
+        count = 0
+        position = 0
+        while position < len(directory):
+            if directory[position : position + 4] != CENTRAL_HEADER_SIGNATURE:
+                raise CorruptBuildException(
+                    "This build's central directory is corrupt."
+                )
+
+            header = CENTRAL_HEADER.unpack_from(directory, position)
+            crc, compressed_size, size, name_size, extra_size, comment_size = header[
+                7:13
+            ]
+            offset = header[16]
+            extra_start = position + CENTRAL_HEADER.size + name_size
+            zip64 = get_zip64_extra(directory[extra_start : extra_start + extra_size])
+            if zip64 is not None:
+                values = iter(zip64)
+                if size == 0xFFFFFFFF:
+                    size = next(values, size)
+                if compressed_size == 0xFFFFFFFF:
+                    compressed_size = next(values, compressed_size)
+                if offset == 0xFFFFFFFF:
+                    offset = next(values, offset)
+
+            entry = self.entries.get(offset)
+            if entry is None or (
+                entry.method in (STORED, DEFLATED)
+                and (entry.actual_crc, entry.actual_compressed_size, entry.actual_size)
+                != (crc, compressed_size, size)
+            ):
+                name = directory[position + CENTRAL_HEADER.size :][:name_size]
+                raise CorruptBuildException(
+                    f"This build's entry {name.decode('utf-8', 'replace')} doesn't "
+                    "match the central directory."
+                )
+
+            count += 1
+            position = extra_start + extra_size + comment_size
+        return count
+
+
+def check_entry(entry):
+    if entry.method not in (STORED, DEFLATED):
+        return
+    if (entry.actual_crc, entry.actual_compressed_size, entry.actual_size) != (
+        entry.crc,
+        entry.compressed_size,
+        entry.size,
+    ):
+        raise CorruptBuildException(f"This build's entry {entry.name} is corrupt.")
+
+
+def get_zip64_extra(extra):
+    """Returns the values of the zip64 extra field, or None if there isn't one"""
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<2H", extra, position)
+        if header_id == ZIP64_EXTRA_ID:
+            field = extra[position + 4 : position + 4 + size]
+            return struct.unpack(f"<{len(field) // 8}Q", field[: len(field) // 8 * 8])
+        position += 4 + size
+    return None
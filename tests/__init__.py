@@ -0,0 +1,4 @@
+from loguru import logger
+
+# Keep the debug logging of every request out of the test output
+logger.remove()
@@ -0,0 +1,78 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeServer:
+    """A shipper server on localhost that answers from what the test sets up"""
+
+    def __init__(self, version="2.15.0"):
+        self.info = {
+            "version": version,
+            "shippy_compat_version": "1.0.0",
+            "shippy_upload_variants": json.dumps(["gapps", "vanilla"]),
+            "shippy_upload_checksum_type": "sha256",
+        }
+        # Filenames and checksums of the builds the server already has
+        self.builds = set()
+        # Listing of unfinished chunked uploads, as returned by the server
+        self.uploads = []
+        # Overrides the answer to build lookups with a status code and JSON body
+        self.lookup_response = None
+        self.requests = []
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeServerHandler)
+        self._httpd.fake = self
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def count(self, path):
+        return sum(1 for _, request_path in self.requests if request_path == path)
+
+
+class FakeServerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_):
+        pass
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        fake.requests.append(("GET", url.path))
+
+        match url.path:
+            case "/api/v1/system/info":
+                self._send(200, fake.info)
+            case "/api/v1/maintainers/build/exists/":
+                self._send(*self._lookup(fake, parse_qs(url.query)))
+            case "/api/v1/maintainers/chunked_upload/":
+                self._send(200, fake.uploads)
+            case _:
+                self._send(404, {"detail": "Not found."})
+
+    def _lookup(self, fake, query):
+        if fake.lookup_response is not None:
+            return fake.lookup_response
+        filename = query["filename"][0]
+        checksum = query[fake.info["shippy_upload_checksum_type"]][0]
+        return 200, {"exists": (filename, checksum) in fake.builds}
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
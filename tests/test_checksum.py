@@ -0,0 +1,98 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from shippy.checksum import get_hashes_of_file, read_blocks, update_hashes_from_file
+from shippy.constants import HASH_BUFFER_SIZE
+
+
+class ReadBlocksTest(unittest.TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) * (HASH_BUFFER_SIZE // 128 + 1)
+
+    def test_reads_whole_file(self):
+        blocks = [bytes(block) for block in read_blocks(io.BytesIO(self.data))]
+        self.assertEqual(b"".join(blocks), self.data)
+        self.assertEqual(len(blocks[0]), HASH_BUFFER_SIZE)
+
+    def test_stops_after_length(self):
+        file = io.BytesIO(self.data)
+        file.seek(10)
+        length = HASH_BUFFER_SIZE + 5
+        blocks = [bytes(block) for block in read_blocks(file, length=length)]
+        self.assertEqual(b"".join(blocks), self.data[10 : 10 + length])
+        self.assertEqual(file.tell(), 10 + length)
+
+    def test_stops_at_end_of_file(self):
+        blocks = list(read_blocks(io.BytesIO(b"abc"), length=HASH_BUFFER_SIZE))
+        self.assertEqual([bytes(block) for block in blocks], [b"abc"])
+
+    def test_empty_file(self):
+        self.assertEqual(list(read_blocks(io.BytesIO(b""))), [])
+
+    def test_buffers_are_reused(self):
+        blocks = list(read_blocks(io.BytesIO(self.data), buffer_count=2))
+        self.assertGreaterEqual(len(blocks), 3)
+        self.assertIs(blocks[0].obj, blocks[2].obj)
+        self.assertIsNot(blocks[0].obj, blocks[1].obj)
+
+
+class GetHashesOfFileTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for patcher in (
+            mock.patch("shippy.cache.CHECKSUM_CACHE_FILE", f"{directory}/sums.json"),
+            mock.patch("shippy.cache.get_checksum_cache_size", return_value=100),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.path = f"{directory}/build.zip"
+        self.data = os.urandom(3 * HASH_BUFFER_SIZE + 7)
+        with open(self.path, "wb") as build:
+            build.write(self.data)
+
+    def test_hashes_every_type_in_one_read(self):
+        hashes = get_hashes_of_file(self.path, ["SHA256", "md5", "sha1"])
+        self.assertEqual(
+            hashes,
+            {
+                "sha256": hashlib.sha256(self.data).hexdigest(),
+                "md5": hashlib.md5(self.data).hexdigest(),
+                "sha1": hashlib.sha1(self.data).hexdigest(),
+            },
+        )
+
+    def test_skips_unsupported_types(self):
+        hashes = get_hashes_of_file(self.path, ["crc32", "shake_128", "sha256"])
+        self.assertEqual(list(hashes), ["sha256"])
+
+    def test_unchanged_file_is_not_read_again(self):
+        hashes = get_hashes_of_file(self.path, ["sha256"])
+        with mock.patch("shippy.checksum.update_hashes_from_file") as update:
+            self.assertEqual(get_hashes_of_file(self.path, ["sha256"]), hashes)
+        update.assert_not_called()
+
+    def test_only_missing_types_are_hashed(self):
+        get_hashes_of_file(self.path, ["sha256"])
+        with mock.patch(
+            "shippy.checksum.update_hashes_from_file",
+            wraps=update_hashes_from_file,
+        ) as update:
+            hashes = get_hashes_of_file(self.path, ["sha256", "md5"])
+        self.assertEqual(len(update.call_args.args[0]), 1)
+        self.assertEqual(hashes["md5"], hashlib.md5(self.data).hexdigest())
+
+    def test_changed_file_is_hashed_again(self):
+        get_hashes_of_file(self.path, ["sha256"])
+        with open(self.path, "ab") as build:
+            build.write(b"more")
+        self.assertEqual(
+            get_hashes_of_file(self.path, ["sha256"]),
+            {"sha256": hashlib.sha256(self.data + b"more").hexdigest()},
+        )
@@ -0,0 +1,240 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from shippy.client import ChunkedUpload, Client, ResumableUpload, progress
+from shippy.exceptions import UploadException
+from shippy.journal import get_journal_entry, set_journal_entry
+from tests.fake_server import FakeServer
+
+BUILD_PATH = "builds/lineage-20.0-20231101-NIGHTLY-gapps-1.zip"
+BUILD_FILENAME = "lineage-20.0-20231101-NIGHTLY-gapps-1.zip"
+CHECKSUM = "a" * 64
+LOOKUP_PATH = "/api/v1/maintainers/build/exists/"
+
+
+class BuildExistsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.client = Client(server_url=self.server.url, token="token")
+        self.addCleanup(self.client.close)
+
+    def test_existing_build(self):
+        self.server.builds.add((BUILD_FILENAME, CHECKSUM))
+        self.assertTrue(self.client.build_exists(BUILD_PATH, CHECKSUM))
+
+    def test_missing_build(self):
+        self.server.builds.add((BUILD_FILENAME, "b" * 64))
+        self.assertFalse(self.client.build_exists(BUILD_PATH, CHECKSUM))
+
+    def test_not_found_keeps_asking(self):
+        self.server.lookup_response = (404, {"detail": "Not found."})
+        self.assertFalse(self.client.build_exists(BUILD_PATH, CHECKSUM))
+
+        self.server.lookup_response = None
+        self.server.builds.add((BUILD_FILENAME, CHECKSUM))
+        self.assertTrue(self.client.build_exists(BUILD_PATH, CHECKSUM))
+        self.assertEqual(self.server.count(LOOKUP_PATH), 2)
+
+    def test_server_error(self):
+        self.server.lookup_response = (500, {"detail": "Internal server error."})
+        self.assertFalse(self.client.build_exists(BUILD_PATH, CHECKSUM))
+
+    def test_unexpected_response(self):
+        self.server.lookup_response = (200, {"id": 1})
+        self.assertFalse(self.client.build_exists(BUILD_PATH, CHECKSUM))
+
+    def test_connection_error(self):
+        with FakeServer() as server:
+            client = Client(server_url=server.url, token="token")
+            client.get_version()
+        self.assertFalse(client.build_exists(BUILD_PATH, CHECKSUM))
+        client.close()
+
+    def test_old_server_is_not_asked(self):
+        self.server.info["version"] = "2.14.0"
+        self.assertFalse(self.client.build_exists(BUILD_PATH, CHECKSUM))
+        self.assertEqual(self.server.count(LOOKUP_PATH), 0)
+
+
+class UploadTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        patcher = mock.patch("shippy.journal.JOURNAL_FILE", f"{directory}/uploads.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.path = f"{directory}/{BUILD_FILENAME}"
+        self.data = os.urandom(1000)
+        with open(self.path, "wb") as build:
+            build.write(self.data)
+
+        self.server = FakeServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.client = Client(server_url=self.server.url, token="token")
+        self.addCleanup(self.client.close)
+
+    def get_journal_entry(self):
+        return get_journal_entry(self.client.server_url, self.path)
+
+
+class ResumeJournalTest(UploadTestCase):
+    def create_upload(self, checksum=None):
+        return ResumableUpload(
+            self.client, self.path, "sha256", hashlib.sha256(), checksum
+        )
+
+    def create_entry(self, offset=600, checkpoints=(200, 400), **values):
+        entry = {
+            "upload_id": "1",
+            "offset": offset,
+            "identity": self.create_upload().identity,
+            "checksum_type": "sha256",
+            "checksum": None,
+            "digest": hashlib.sha256(self.data[:offset]).hexdigest(),
+            "checkpoints": [
+                [position, hashlib.sha256(self.data[:position]).hexdigest()]
+                for position in checkpoints
+            ],
+        }
+        entry.update(values)
+        return entry
+
+    def touch(self):
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_unchanged_build(self):
+        upload = self.create_upload()
+        self.assertTrue(upload._is_journal_entry_valid(self.create_entry()))
+        self.assertEqual(
+            upload.hash_obj.hexdigest(), hashlib.sha256(self.data[:600]).hexdigest()
+        )
+
+    def test_touched_build_with_same_checksum(self):
+        entry = self.create_entry(checksum="a" * 64)
+        self.touch()
+        self.assertTrue(self.create_upload("a" * 64)._is_journal_entry_valid(entry))
+        self.assertFalse(self.create_upload("b" * 64)._is_journal_entry_valid(entry))
+
+    def test_touched_build_with_same_digests(self):
+        entry = self.create_entry()
+        self.touch()
+        upload = self.create_upload()
+        self.assertTrue(upload._is_journal_entry_valid(entry))
+        self.assertEqual(
+            upload.hash_obj.hexdigest(), hashlib.sha256(self.data[:600]).hexdigest()
+        )
+
+    def test_modified_build(self):
+        entry = self.create_entry()
+        with open(self.path, "r+b") as build:
+            build.seek(300)
+            build.write(bytes(byte ^ 0xFF for byte in self.data[300:301]))
+        self.touch()
+        self.assertFalse(self.create_upload()._is_journal_entry_valid(entry))
+
+    def test_touched_build_without_digest(self):
+        entry = self.create_entry(digest=None)
+        self.touch()
+        self.assertFalse(self.create_upload()._is_journal_entry_valid(entry))
+
+    def test_offset_beyond_build(self):
+        entry = self.create_entry(offset=1001, checkpoints=())
+        self.assertFalse(self.create_upload()._is_journal_entry_valid(entry))
+
+    def test_other_checksum_type(self):
+        entry = self.create_entry(checksum_type="md5")
+        self.assertFalse(self.create_upload()._is_journal_entry_valid(entry))
+
+    def test_load_resumes_from_valid_entry(self):
+        set_journal_entry(self.client.server_url, self.path, self.create_entry())
+        upload = self.create_upload()
+        self.assertTrue(upload._load_journal())
+        self.assertEqual((upload.offset, upload.upload_id), (600, "1"))
+        self.assertFalse(upload.offset_confirmed)
+
+    def test_load_restarts_from_invalid_entry(self):
+        entry = self.create_entry(checksum_type="md5")
+        set_journal_entry(self.client.server_url, self.path, entry)
+        upload = self.create_upload()
+        self.assertTrue(upload._load_journal())
+        self.assertEqual((upload.offset, upload.upload_id), (0, ""))
+        self.assertIsNone(self.get_journal_entry())
+
+    def test_load_without_entry(self):
+        self.assertFalse(self.create_upload()._load_journal())
+
+    def test_saved_entry_is_valid(self):
+        upload = self.create_upload()
+        upload.upload_id = "1"
+        upload.offset = 600
+        upload.hash_obj.update(self.data[:600])
+        upload._save_journal(force=True)
+
+        self.touch()
+        self.assertTrue(
+            self.create_upload()._is_journal_entry_valid(self.get_journal_entry())
+        )
+
+
+class ResyncTest(UploadTestCase):
+    def setUp(self):
+        super().setUp()
+        progress_task = progress.add_task("Uploading", total=len(self.data))
+        self.addCleanup(progress.remove_task, progress_task)
+        self.upload = ChunkedUpload(
+            self.client, self.path, progress_task, hashlib.sha256()
+        )
+        self.upload.upload_id = "1"
+        self.upload.offset = 100
+        self.upload.hash_obj.update(self.data[:100])
+
+    def set_server_offset(self, offset):
+        self.server.uploads = [
+            {
+                "id": "1",
+                "filename": BUILD_FILENAME,
+                "offset": offset,
+                "created_at": "2023-11-01T00:00:00Z",
+            }
+        ]
+
+    def test_continues_from_server_offset(self):
+        self.set_server_offset(300)
+        self.upload._resync()
+        self.assertEqual(self.upload.offset, 300)
+        self.assertEqual(
+            self.upload.hash_obj.hexdigest(),
+            hashlib.sha256(self.data[:300]).hexdigest(),
+        )
+
+    def test_finds_upload_created_by_failed_chunk(self):
+        self.upload.upload_id = ""
+        self.upload.offset = 0
+        self.upload.hash_obj = hashlib.sha256()
+        self.set_server_offset(100)
+        self.upload._resync()
+        self.assertEqual((self.upload.offset, self.upload.upload_id), (100, "1"))
+
+    def test_server_offset_behind(self):
+        self.set_server_offset(50)
+        with self.assertRaises(UploadException):
+            self.upload._resync()
+
+    def test_confirmed_upload_gone(self):
+        with self.assertRaises(UploadException):
+            self.upload._resync()
+
+    def test_journal_upload_gone(self):
+        self.upload.offset_confirmed = False
+        self.upload._save_journal(force=True)
+        self.upload._resync()
+        self.assertEqual((self.upload.offset, self.upload.upload_id), (0, ""))
+        self.assertEqual(self.upload.hash_obj.hexdigest(), hashlib.sha256().hexdigest())
+        self.assertIsNone(self.get_journal_entry())
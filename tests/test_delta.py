@@ -0,0 +1,115 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from shippy.constants import (
+    DELTA_BOUNDARY_RUN,
+    DELTA_MAX_BLOCK_SIZE,
+    DELTA_MIN_BLOCK_SIZE,
+)
+from shippy.delta import BOUNDARY_TABLE, find_blocks
+
+BOUNDARY_BYTES = bytes(value for value in range(256) if BOUNDARY_TABLE[value])
+OTHER_BYTES = bytes(value for value in range(256) if not BOUNDARY_TABLE[value])
+
+
+def get_random_bytes(size, values):
+    """Returns random bytes made only of the given values"""
+    return os.urandom(size).translate(
+        bytes(values[value % 128] for value in range(256))
+    )
+
+
+def get_marker():
+    return get_random_bytes(DELTA_BOUNDARY_RUN, BOUNDARY_BYTES)
+
+
+class FindBlocksTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def find_blocks(self, data, hash_obj=None):
+        path = f"{self.directory}/build.zip"
+        with open(path, "wb") as build:
+            build.write(data)
+        return find_blocks(path, hash_obj)
+
+    def create_data(self, *block_sizes):
+        """Returns data that is split right after each of the given block sizes"""
+        data = b""
+        for size in block_sizes:
+            data += get_random_bytes(size - DELTA_BOUNDARY_RUN, OTHER_BYTES)
+            data += get_marker()
+        return data
+
+    def assertCovers(self, blocks, data):
+        self.assertEqual(blocks[0].offset, 0)
+        for block, next_block in zip(blocks, blocks[1:]):
+            self.assertEqual(block.offset + block.size, next_block.offset)
+        self.assertEqual(blocks[-1].offset + blocks[-1].size, len(data))
+        for block in blocks:
+            self.assertEqual(
+                block.digest,
+                hashlib.sha256(data[block.offset :][: block.size]).hexdigest(),
+            )
+
+    def test_empty_file(self):
+        self.assertEqual(self.find_blocks(b""), [])
+
+    def test_small_file(self):
+        data = get_marker() * 10
+        blocks = self.find_blocks(data)
+        self.assertEqual(len(blocks), 1)
+        self.assertCovers(blocks, data)
+
+    def test_splits_after_boundary_runs(self):
+        sizes = [
+            DELTA_MIN_BLOCK_SIZE,
+            DELTA_MIN_BLOCK_SIZE + 1,
+            3 * DELTA_MIN_BLOCK_SIZE,
+        ]
+        data = self.create_data(*sizes) + b"end"
+        blocks = self.find_blocks(data)
+        self.assertEqual([block.size for block in blocks], sizes + [3])
+        self.assertCovers(blocks, data)
+
+    def test_ignores_boundary_runs_in_first_bytes(self):
+        data = self.create_data(DELTA_MIN_BLOCK_SIZE // 2, DELTA_MIN_BLOCK_SIZE)
+        blocks = self.find_blocks(data)
+        self.assertEqual([block.size for block in blocks], [len(data)])
+
+    def test_splits_at_max_size_without_boundaries(self):
+        data = get_random_bytes(2 * DELTA_MAX_BLOCK_SIZE + 1, OTHER_BYTES)
+        blocks = self.find_blocks(data)
+        self.assertEqual(
+            [block.size for block in blocks],
+            [DELTA_MAX_BLOCK_SIZE, DELTA_MAX_BLOCK_SIZE, 1],
+        )
+        self.assertCovers(blocks, data)
+
+    def test_random_data(self):
+        data = os.urandom(3 * DELTA_MAX_BLOCK_SIZE)
+        hash_obj = hashlib.sha256()
+        blocks = self.find_blocks(data, hash_obj)
+        self.assertCovers(blocks, data)
+        self.assertEqual(hash_obj.hexdigest(), hashlib.sha256(data).hexdigest())
+        self.assertEqual(
+            [block.digest for block in self.find_blocks(data)],
+            [block.digest for block in blocks],
+        )
+
+    def test_insertion_only_changes_its_block(self):
+        data = self.create_data(*[DELTA_MIN_BLOCK_SIZE * 2] * 4)
+        middle = DELTA_MIN_BLOCK_SIZE * 3
+        changed = data[:middle] + get_random_bytes(1000, OTHER_BYTES) + data[middle:]
+
+        digests = [block.digest for block in self.find_blocks(data)]
+        changed_digests = [block.digest for block in self.find_blocks(changed)]
+        self.assertEqual(len(changed_digests), 4)
+        self.assertEqual(
+            [digest in digests for digest in changed_digests],
+            [True, False, True, True],
+        )
@@ -0,0 +1,43 @@
+import argparse
+import unittest
+from unittest import mock
+
+from shippy.__main__ import get_upload_concurrency, split_build_filename
+from shippy.exceptions import ValidationException
+
+
+class SplitBuildFilenameTest(unittest.TestCase):
+    def test_build_filename(self):
+        self.assertEqual(
+            split_build_filename("builds/lineage-20.0-20231101-NIGHTLY-gapps-1.zip"),
+            ["lineage", "20.0", "20231101", "NIGHTLY", "gapps", "1"],
+        )
+
+    def test_unexpected_filenames(self):
+        for filename in (
+            "lineage-20.0-20231101-NIGHTLY-gapps.zip",
+            "lineage-20.0-20231101-NIGHTLY-gapps-1-extra.zip",
+            "build.zip",
+        ):
+            with self.subTest(filename=filename):
+                with self.assertRaises(ValidationException):
+                    split_build_filename(filename)
+
+
+class GetUploadConcurrencyTest(unittest.TestCase):
+    def get_upload_concurrency(self, jobs=None, config_value=2):
+        with mock.patch(
+            "shippy.__main__.get_optional_int_config_value", return_value=config_value
+        ):
+            return get_upload_concurrency(argparse.Namespace(jobs=jobs))
+
+    def test_argument_overrides_config(self):
+        self.assertEqual(self.get_upload_concurrency(jobs=4), 4)
+
+    def test_config_value(self):
+        self.assertEqual(self.get_upload_concurrency(), 2)
+
+    def test_at_least_one_upload(self):
+        self.assertEqual(self.get_upload_concurrency(jobs=-1), 1)
+        self.assertEqual(self.get_upload_concurrency(config_value=0), 1)
+        self.assertEqual(self.get_upload_concurrency(config_value=-3), 1)
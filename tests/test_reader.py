@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from shippy.reader import SharedChunkReader
+from shippy.sizing import ChunkSizer
+
+SEGMENT_SIZE = 1000
+CHUNK_SIZE = 300
+
+
+def read_all(view):
+    data = b""
+    while chunk := view.read():
+        data += chunk.data
+        view.release(chunk)
+    return data
+
+
+class SharedChunkReaderTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = f"{directory}/build.zip"
+        self.data = os.urandom(10 * SEGMENT_SIZE + 123)
+        with open(self.path, "wb") as build:
+            build.write(self.data)
+
+        self.source = SharedChunkReader(self.path, SEGMENT_SIZE, buffer_count=2)
+        self.source.__enter__()
+        self.addCleanup(self.source.close)
+
+    def open(self, offset=0):
+        view = self.source.open(offset, ChunkSizer(CHUNK_SIZE, CHUNK_SIZE))
+        self.addCleanup(view.close)
+        return view
+
+    def read_in_background(self, view):
+        result = {}
+        thread = threading.Thread(
+            target=lambda: result.setdefault("data", read_all(view)), daemon=True
+        )
+        thread.start()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive(), "The view is stuck")
+        return result["data"]
+
+    def test_views_in_step(self):
+        views = [self.open(), self.open()]
+        data = [b"", b""]
+        finished = [False, False]
+        while not all(finished):
+            for index, view in enumerate(views):
+                if not finished[index]:
+                    chunk = view.read()
+                    if chunk is None:
+                        finished[index] = True
+                    else:
+                        data[index] += chunk.data
+                        view.release(chunk)
+        self.assertEqual(data, [self.data, self.data])
+
+    def test_idle_view_does_not_hold_up_others(self):
+        fast_view = self.open()
+        slow_view = self.open()
+        self.assertEqual(self.read_in_background(fast_view), self.data)
+        self.assertEqual(read_all(slow_view), self.data)
+
+    def test_unreleased_chunk_does_not_hold_up_others(self):
+        fast_view = self.open()
+        slow_view = self.open()
+        held_chunk = slow_view.read()
+        self.assertEqual(self.read_in_background(fast_view), self.data)
+
+        self.assertEqual(bytes(held_chunk.data), self.data[:CHUNK_SIZE])
+        slow_view.release(held_chunk)
+        self.assertEqual(read_all(slow_view), self.data[CHUNK_SIZE:])
+
+    def test_closed_view_does_not_hold_up_others(self):
+        fast_view = self.open()
+        closed_view = self.open()
+        closed_view.read()
+        closed_view.close()
+        self.assertEqual(self.read_in_background(fast_view), self.data)
+
+    def test_view_ahead_reads_on_its_own(self):
+        ahead_view = self.open(offset=5 * SEGMENT_SIZE + 10)
+        self.assertEqual(
+            self.read_in_background(ahead_view), self.data[5 * SEGMENT_SIZE + 10 :]
+        )
+        self.assertEqual(self.read_in_background(self.open()), self.data)
@@ -0,0 +1,64 @@
+import unittest
+
+from shippy.constants import CHUNK_TARGET_DURATION
+from shippy.sizing import ChunkSizer
+
+MB = 1000000
+
+
+class ChunkSizerTest(unittest.TestCase):
+    def test_starts_at_min_size(self):
+        self.assertEqual(ChunkSizer(MB, 16 * MB).get_size(), MB)
+
+    def test_max_size_is_at_least_min_size(self):
+        sizer = ChunkSizer(4 * MB, MB)
+        self.assertEqual(sizer.max_size, 4 * MB)
+
+    def test_grows_at_most_twofold(self):
+        sizer = ChunkSizer(MB, 16 * MB)
+        sizer.record(MB, 0.01)
+        self.assertEqual(sizer.get_size(), 2 * MB)
+        sizer.record(2 * MB, 0.01)
+        self.assertEqual(sizer.get_size(), 4 * MB)
+
+    def test_targets_chunk_duration(self):
+        sizer = ChunkSizer(MB, 16 * MB)
+        for _ in range(10):
+            sizer.record(sizer.get_size(), sizer.get_size() / (3 * MB))
+        self.assertEqual(sizer.get_size(), 3 * MB * CHUNK_TARGET_DURATION)
+
+    def test_stays_within_bounds(self):
+        sizer = ChunkSizer(MB, 4 * MB)
+        for _ in range(10):
+            sizer.record(sizer.get_size(), 0.001)
+        self.assertEqual(sizer.get_size(), 4 * MB)
+
+        # Throughput is smoothed, so it takes a while for slow chunks to win out
+        for _ in range(50):
+            sizer.record(sizer.get_size(), 1000)
+        self.assertEqual(sizer.get_size(), MB)
+
+    def test_ignores_instant_chunks(self):
+        sizer = ChunkSizer(MB, 16 * MB)
+        sizer.record(MB, 0)
+        self.assertEqual(sizer.get_size(), MB)
+
+    def test_shrink_lowers_max_size(self):
+        sizer = ChunkSizer(MB, 16 * MB)
+        for _ in range(10):
+            sizer.record(sizer.get_size(), 0.001)
+        self.assertEqual(sizer.get_size(), 16 * MB)
+
+        self.assertTrue(sizer.shrink(16 * MB))
+        self.assertEqual(sizer.max_size, 8 * MB)
+        self.assertEqual(sizer.get_size(), 8 * MB)
+
+        sizer.record(sizer.get_size(), 0.001)
+        self.assertEqual(sizer.get_size(), 8 * MB)
+
+    def test_shrink_stops_at_min_size(self):
+        sizer = ChunkSizer(MB, 3 * MB)
+        self.assertTrue(sizer.shrink(3 * MB))
+        self.assertTrue(sizer.shrink(sizer.max_size))
+        self.assertEqual(sizer.max_size, MB)
+        self.assertFalse(sizer.shrink(MB))
@@ -0,0 +1,104 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from shippy.exceptions import CorruptBuildException
+from shippy.zipcheck import ZipVerifier
+
+
+class UnseekableFile(io.RawIOBase):
+    """Makes zipfile write data descriptors, as when a zip is streamed"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def create_zip(compression=zipfile.ZIP_DEFLATED, streamed=False):
+    output = UnseekableFile() if streamed else io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=compression) as build_zip:
+        build_zip.writestr("payload.bin", os.urandom(300000))
+        build_zip.writestr("META-INF/com/android/metadata", b"post-build=test\n" * 100)
+    return bytes(output.data if streamed else output.getvalue())
+
+
+class ZipVerifierTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def verify(self, data, block_size=4096):
+        path = f"{self.directory}/build.zip"
+        with open(path, "wb") as build:
+            build.write(data)
+
+        verifier = ZipVerifier(path)
+        for position in range(0, len(data), block_size):
+            verifier.update(data[position : position + block_size])
+        verifier.finish()
+
+    def assertCorrupt(self, data):
+        with self.assertRaises(CorruptBuildException):
+            self.verify(data)
+
+    def test_deflated_zip(self):
+        self.verify(create_zip())
+
+    def test_stored_zip(self):
+        self.verify(create_zip(zipfile.ZIP_STORED))
+
+    def test_headers_split_between_blocks(self):
+        self.verify(create_zip(), block_size=7)
+
+    def test_streamed_deflated_zip(self):
+        self.verify(create_zip(streamed=True))
+
+    def test_streamed_stored_zip(self):
+        # Its entries can't be told apart while reading, so zipfile checks it
+        self.verify(create_zip(zipfile.ZIP_STORED, streamed=True))
+
+    def test_empty_file(self):
+        self.assertCorrupt(b"")
+
+    def test_not_a_zip(self):
+        self.assertCorrupt(os.urandom(10000))
+
+    def test_truncated_in_entry(self):
+        data = create_zip()
+        self.assertCorrupt(data[: len(data) // 2])
+
+    def test_truncated_in_central_directory(self):
+        self.assertCorrupt(create_zip()[:-30])
+
+    def test_truncated_streamed_stored_zip(self):
+        self.assertCorrupt(create_zip(zipfile.ZIP_STORED, streamed=True)[:-30])
+
+    def test_corrupt_stored_data(self):
+        for streamed in (False, True):
+            with self.subTest(streamed=streamed):
+                data = bytearray(create_zip(zipfile.ZIP_STORED, streamed=streamed))
+                data[1000] ^= 0xFF
+                self.assertCorrupt(bytes(data))
+
+    def test_corrupt_deflated_data(self):
+        for streamed in (False, True):
+            with self.subTest(streamed=streamed):
+                data = bytearray(create_zip(streamed=streamed))
+                data[1000] ^= 0xFF
+                self.assertCorrupt(bytes(data))
+
+    def test_central_directory_mismatch(self):
+        data = bytearray(create_zip())
+        # The CRC of the first entry in the central directory
+        position = data.rfind(b"PK\x01\x02", 0, data.rfind(b"PK\x01\x02")) + 16
+        data[position] ^= 0xFF
+        self.assertCorrupt(bytes(data))